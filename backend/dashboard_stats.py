@@ -0,0 +1,85 @@
+"""Materialized dashboard counters.
+
+A single document in the ``stats`` collection holds the asset total, the asset
+count per status and the employee total. Every write path in server.py applies
+its change with ``$inc`` right after the write itself, so /dashboard/stats is one
+point read. ``reconcile_stats`` recomputes the figures from the collections and
+repairs any drift; it runs on startup and from ``scripts/reconcile_stats.py``.
+"""
+from collections import Counter
+from typing import Dict, Optional
+
+STATS_ID = "dashboard"
+
+
+def status_key(status) -> str:
+    # Field names may not contain '.' or start with '$'
+    return str(status).replace(".", "_").replace("$", "_")
+
+
+async def compute_stats(db) -> dict:
+    by_status = await db.assets.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]).to_list(None)
+    assets_by_status = Counter()
+    for group in by_status:
+        assets_by_status[status_key(group["_id"])] += group["count"]
+    return {
+        "total_assets": sum(assets_by_status.values()),
+        "assets_by_status": dict(assets_by_status),
+        "total_employees": await db.employees.count_documents({})
+    }
+
+
+async def read_stats(db) -> Optional[dict]:
+    return await db.stats.find_one({"_id": STATS_ID}, {"_id": 0})
+
+
+async def increment_stats(db, total_assets: int = 0, total_employees: int = 0, status_changes: Optional[Dict[str, int]] = None):
+    """Apply counter deltas; status_changes maps an asset status to how much its count moved."""
+    inc = {}
+    if total_assets:
+        inc["total_assets"] = total_assets
+    if total_employees:
+        inc["total_employees"] = total_employees
+    for status, change in (status_changes or {}).items():
+        if change:
+            field = f"assets_by_status.{status_key(status)}"
+            inc[field] = inc.get(field, 0) + change
+    if inc:
+        await db.stats.update_one({"_id": STATS_ID}, {"$inc": inc}, upsert=True)
+
+
+def status_move(old_status, new_status) -> Dict[str, int]:
+    """Delta for an asset whose status went from old_status to new_status."""
+    if old_status == new_status:
+        return {}
+    return {old_status: -1, new_status: 1}
+
+
+def dashboard_figures(stats: dict) -> dict:
+    by_status = stats.get("assets_by_status", {})
+    return {
+        "total_assets": stats.get("total_assets", 0),
+        "assigned_assets": by_status.get("Assigned", 0),
+        "available_assets": by_status.get("Available", 0),
+        "total_employees": stats.get("total_employees", 0)
+    }
+
+
+async def reconcile_stats(db, fix: bool = True) -> Dict[str, tuple]:
+    """Recompute the counters from scratch. Returns {field: (stored, actual)} for every
+    counter that had drifted, and overwrites the stored document when ``fix`` is set."""
+    actual = await compute_stats(db)
+    stored = await read_stats(db) or {}
+
+    drift = {}
+    for field in ("total_assets", "total_employees"):
+        if stored.get(field, 0) != actual[field]:
+            drift[field] = (stored.get(field, 0), actual[field])
+    stored_by_status = {k: v for k, v in stored.get("assets_by_status", {}).items() if v}
+    for status in set(stored_by_status) | set(actual["assets_by_status"]):
+        if stored_by_status.get(status, 0) != actual["assets_by_status"].get(status, 0):
+            drift[f"assets_by_status.{status}"] = (stored_by_status.get(status, 0), actual["assets_by_status"].get(status, 0))
+
+    if fix and (drift or not stored):
+        await db.stats.replace_one({"_id": STATS_ID}, actual, upsert=True)
+    return drift
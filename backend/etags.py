@@ -0,0 +1,45 @@
+"""ETags for list endpoints, derived from per-collection version counters.
+
+Every write endpoint bumps the version of the collections it touched (through
+``mark_changed`` in server.py), so a list response can be tagged with the
+versions of the collections it was read from before any query runs. A request
+whose ``If-None-Match`` still matches is answered with 304 straight away.
+
+Versions live in the API process, like the search index, the import jobs and the
+caches; the API runs as a single worker (see ``check_single_worker`` in server.py),
+and none of the scripts write to the collections served with ETags. The process
+tags its ETags with a random boot id so values never carry over a restart, which
+is also how clients pick up a manual edit made in the database.
+"""
+import uuid
+from typing import Dict, Optional
+
+
+class CollectionVersions:
+    def __init__(self):
+        self.boot_id = uuid.uuid4().hex[:12]
+        self._versions: Dict[str, int] = {}
+
+    def bump(self, *collections: str):
+        for collection in collections:
+            self._versions[collection] = self._versions.get(collection, 0) + 1
+
+    def etag(self, *collections: str) -> str:
+        versions = ".".join(f"{collection}{self._versions.get(collection, 0)}" for collection in collections)
+        return f'W/"{self.boot_id}-{versions}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match header value (a list of tags or ``*``)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
@@ -0,0 +1,59 @@
+"""The thread pool for the blocking openpyxl and csv work done by exports, imports and templates.
+
+Nothing CPU-bound should run on the event loop: a 20k-row workbook takes seconds
+to write, and every other request waits for it. ``offload.run(func, *args)`` runs
+func on a pool of ``OFFLOAD_WORKERS`` threads, created on first use.
+
+It is a thread pool because the heavy calls work on objects that live in this
+process, such as a write_only workbook being filled batch by batch or a reader
+halfway through an upload, which can't be handed to another process. openpyxl
+holds the GIL while it works, so the pool keeps the loop responsive but does not
+make an export itself faster.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+OFFLOAD_WORKERS = int(os.environ.get('OFFLOAD_WORKERS', 4))
+
+
+class Offloader:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self.running = 0
+        self.completed = 0
+        self.total_seconds = 0.0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="offload")
+        return self._threads
+
+    async def run(self, func: Callable, *args) -> Any:
+        self.running += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), func, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.total_seconds += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.running,
+            "completed": self.completed,
+            "avg_ms": round(self.total_seconds * 1000 / self.completed, 1) if self.completed else 0.0
+        }
+
+    def shutdown(self):
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+
+
+offload = Offloader(OFFLOAD_WORKERS)
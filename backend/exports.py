@@ -0,0 +1,164 @@
+"""Streaming exports in XLSX, CSV and NDJSON.
+
+Rows are pulled from an async iterable (normally a Motor cursor) in batches. For
+XLSX each batch is appended to a ``write_only`` openpyxl workbook, which keeps
+only the current row in memory, on the offload thread pool; the finished file is
+saved there too, spooled to disk and streamed out in chunks. CSV and NDJSON skip the workbook entirely and encode rows straight from
+the cursor as the response is sent.
+"""
+import csv
+import json
+import os
+from io import StringIO
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterable, List, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from openpyxl import Workbook
+
+from executors import offload
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+EXPORT_FORMATS = ("xlsx", "csv", "ndjson")
+
+# Documents fetched per cursor round trip
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
+# Files up to this size stay in memory, bigger ones roll over to a temp file
+EXPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# (header, document field) pairs, in sheet order
+Columns = List[Tuple[str, str]]
+
+
+def batched(cursor):
+    """Ask Motor for EXPORT_BATCH_SIZE documents per round trip when given a cursor."""
+    if hasattr(cursor, "batch_size"):
+        cursor.batch_size(EXPORT_BATCH_SIZE)
+    return cursor
+
+
+def append_rows(ws, rows: List[list]):
+    for row in rows:
+        ws.append(row)
+
+
+async def write_xlsx(documents: AsyncIterable[dict], title: str, columns: Columns) -> SpooledTemporaryFile:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    ws.append([header for header, _ in columns])
+
+    rows = []
+    async for document in batched(documents):
+        rows.append([document.get(field, "") for _, field in columns])
+        if len(rows) >= EXPORT_BATCH_SIZE:
+            await offload.run(append_rows, ws, rows)
+            rows = []
+    if rows:
+        await offload.run(append_rows, ws, rows)
+
+    output = SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+    await offload.run(wb.save, output)
+    output.seek(0)
+    return output
+
+
+def iter_file(output):
+    try:
+        while True:
+            chunk = output.read(EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        output.close()
+
+
+async def xlsx_response(documents: AsyncIterable[dict], title: str, columns: Columns, filename: str) -> StreamingResponse:
+    output = await write_xlsx(documents, title, columns)
+    size = output.seek(0, os.SEEK_END)
+    output.seek(0)
+
+    return StreamingResponse(
+        iter_file(output),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Content-Length": str(size)
+        }
+    )
+
+
+async def iter_csv(documents: AsyncIterable[dict], columns: Columns):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in columns])
+
+    async for document in batched(documents):
+        writer.writerow(["" if document.get(field) is None else document.get(field) for _, field in columns])
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+async def iter_ndjson(documents: AsyncIterable[dict], columns: Columns):
+    lines = []
+    size = 0
+
+    async for document in batched(documents):
+        line = json.dumps({header: document.get(field) for header, field in columns}, default=str) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield "".join(lines).encode("utf-8")
+            lines, size = [], 0
+
+    if lines:
+        yield "".join(lines).encode("utf-8")
+
+
+async def iter_json_array(documents: AsyncIterable[dict]):
+    """Encode documents as one JSON array without holding them all in memory."""
+    parts = ["["]
+    size = 1
+    first = True
+
+    async for document in batched(documents):
+        line = ("" if first else ",") + json.dumps(document, default=str)
+        first = False
+        parts.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield "".join(parts).encode("utf-8")
+            parts, size = [], 0
+
+    parts.append("]")
+    yield "".join(parts).encode("utf-8")
+
+
+def json_array_response(documents: AsyncIterable[dict]) -> StreamingResponse:
+    return StreamingResponse(iter_json_array(documents), media_type="application/json")
+
+
+async def export_response(format: str, documents: AsyncIterable[dict], title: str, columns: Columns, filename: str) -> StreamingResponse:
+    """Build the response for ``format``; ``filename`` is given without extension."""
+    if format == "xlsx":
+        return await xlsx_response(documents, title, columns, f"{filename}.xlsx")
+    if format == "csv":
+        body, media_type = iter_csv(documents, columns), CSV_MEDIA_TYPE
+    elif format == "ndjson":
+        body, media_type = iter_ndjson(documents, columns), NDJSON_MEDIA_TYPE
+    else:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{format}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}.{format}"}
+    )
@@ -0,0 +1,40 @@
+"""orjson responses for list endpoints that return documents straight from Mongo.
+
+With ``response_model=List[Model]`` FastAPI validates every document into a model,
+dumps it back to a dict, runs ``jsonable_encoder`` over the result and only then
+encodes it. The documents these endpoints read were validated when they were
+written, so the fast path just asks Mongo for the model's fields, fills in the
+defaults of optional fields that are missing and encodes the list with orjson.
+The endpoints keep ``response_model`` so the OpenAPI schema is unchanged.
+"""
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from fastapi.responses import ORJSONResponse
+
+
+@lru_cache(maxsize=None)
+def _model_shape(model) -> Tuple[dict, tuple]:
+    projection = {"_id": 0}
+    defaults = []
+    for name, field in model.model_fields.items():
+        projection[name] = 1
+        if not field.is_required():
+            defaults.append((name, field.get_default(call_default_factory=True)))
+    return projection, tuple(defaults)
+
+
+def model_projection(model: type) -> dict:
+    """Mongo projection returning exactly the fields of model, as extra="ignore" would."""
+    return dict(_model_shape(model)[0])
+
+
+def trusted_response(model: type, documents: List[dict], headers: Optional[dict] = None) -> ORJSONResponse:
+    """Encode documents that already match model without validating them again."""
+    _, defaults = _model_shape(model)
+    if defaults:
+        for document in documents:
+            for name, default in defaults:
+                if name not in document:
+                    document[name] = default
+    return ORJSONResponse(documents, headers=headers)
@@ -0,0 +1,146 @@
+"""Background processing for spreadsheet imports.
+
+The import endpoints spool the upload, hand it to ``ImportJobs.submit`` and answer
+with the job straight away; clients poll ``GET /imports/{job_id}`` for progress.
+At most ``IMPORT_MAX_RUNNING_JOBS`` imports run at once and the rest wait their
+turn, and once ``IMPORT_MAX_PENDING_JOBS`` are queued or running new uploads are
+refused with 429, so a burst of imports can't crowd out interactive requests.
+
+Jobs live in the API process, like the search index, and are forgotten
+``IMPORT_JOB_RETENTION`` seconds after they finish. A poll reports how many rows
+failed and the first ``IMPORT_JOB_ERROR_PREVIEW`` of them; the full, sorted list
+is only in the summary a finished job returns as ``result``.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import IO, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+IMPORT_MAX_RUNNING_JOBS = int(os.environ.get('IMPORT_MAX_RUNNING_JOBS', 2))
+IMPORT_MAX_PENDING_JOBS = int(os.environ.get('IMPORT_MAX_PENDING_JOBS', 20))
+IMPORT_JOB_RETENTION = int(os.environ.get('IMPORT_JOB_RETENTION', 3600))
+IMPORT_JOB_ERROR_PREVIEW = int(os.environ.get('IMPORT_JOB_ERROR_PREVIEW', 20))
+
+logger = logging.getLogger(__name__)
+
+def format_row_errors(row_errors: List[tuple]) -> List[str]:
+    return [f"Row {row_number}: {message}" for row_number, message in sorted(row_errors, key=lambda error: error[0])]
+
+
+def _timestamp(seconds: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat() if seconds else None
+
+
+class ImportJob:
+    def __init__(self, kind: str, filename: Optional[str], username: str):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.filename = filename
+        self.username = username
+        self.status = "queued"
+        self.rows_total: Optional[int] = None
+        self.rows_processed = 0
+        # (row number, message); processors append to this while they run
+        self.row_errors: List[tuple] = []
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def advance(self, rows: int):
+        self.rows_processed += rows
+
+    def to_dict(self) -> dict:
+        elapsed = 0.0
+        if self.started_at:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "status": self.status,
+            "rows_total": self.rows_total,
+            "rows_processed": self.rows_processed,
+            "rows_per_second": round(self.rows_processed / elapsed, 1) if elapsed else 0.0,
+            "elapsed_seconds": round(elapsed, 3),
+            "error_count": len(self.row_errors),
+            # The first errors found, which is not quite row order: write errors are found after their batch
+            "errors": format_row_errors(self.row_errors[:IMPORT_JOB_ERROR_PREVIEW]),
+            "result": self.result,
+            "error": self.error,
+            "created_at": _timestamp(self.created_at),
+            "started_at": _timestamp(self.started_at),
+            "finished_at": _timestamp(self.finished_at)
+        }
+
+
+# process(job, upload) does the import and returns the summary stored in job.result
+Processor = Callable[["ImportJob", IO[bytes]], Awaitable[dict]]
+
+
+class ImportJobs:
+    def __init__(self, max_running: int, max_pending: int, retention: float):
+        self.max_running = max_running
+        self.max_pending = max_pending
+        self.retention = retention
+        self._jobs: Dict[str, ImportJob] = {}
+        self._tasks = set()
+        self._semaphore = None
+
+    def _purge(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def pending(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+
+    def submit(self, kind: str, filename: Optional[str], username: str, process: Processor, upload: IO[bytes]) -> ImportJob:
+        """Queue process(job, upload). The job owns upload and closes it when it finishes."""
+        self._purge()
+        if self.pending() >= self.max_pending:
+            upload.close()
+            raise HTTPException(status_code=429, detail="Too many imports in progress, please try again shortly")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_running)
+
+        job = ImportJob(kind, filename, username)
+        self._jobs[job.job_id] = job
+        task = asyncio.create_task(self._run(job, process, upload))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: ImportJob, process: Processor, upload: IO[bytes]):
+        async with self._semaphore:
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await process(job, upload)
+                job.status = "completed"
+            except HTTPException as e:
+                job.error = e.detail
+                job.status = "failed"
+            except Exception as e:
+                logger.warning(f"Import job {job.job_id} ({job.kind}) failed: {str(e)}")
+                job.error = f"Error processing file: {str(e)}"
+                job.status = "failed"
+            finally:
+                upload.close()
+                job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        return self._jobs.get(job_id)
+
+    def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+
+
+import_jobs = ImportJobs(IMPORT_MAX_RUNNING_JOBS, IMPORT_MAX_PENDING_JOBS, IMPORT_JOB_RETENTION)
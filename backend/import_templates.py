@@ -0,0 +1,89 @@
+"""Column definitions for the spreadsheet imports and the templates built from them.
+
+The import endpoints in server.py validate uploads against the same lists the
+templates are rendered from, so the two cannot drift apart. A template never
+changes while the process runs: it is rendered once, off the event loop, on
+first download and the bytes are served from memory afterwards.
+"""
+import hashlib
+from io import BytesIO
+from typing import Dict, Tuple
+
+from fastapi import Request, Response
+from openpyxl import Workbook
+
+from etags import etag_matches
+from executors import offload
+from exports import XLSX_MEDIA_TYPE
+
+# Seconds browsers may reuse a downloaded template before asking again
+TEMPLATE_MAX_AGE = 24 * 60 * 60
+
+EMPLOYEE_IMPORT_COLUMNS = ["Full Name", "Department", "Designation", "Email", "Date of Joining", "Status"]
+
+ASSET_IMPORT_COLUMNS = ["Asset Name", "Category", "Brand", "Serial Number", "IMEI 2", "Condition", "Status"]
+ASSET_REQUIRED_COLUMNS = [column for column in ASSET_IMPORT_COLUMNS if column != "IMEI 2"]
+
+# (assignment field, column) pairs that may be left out of an assignments sheet
+ASSIGNMENT_OPTIONAL_COLUMNS = [
+    ("return_date", "Return Date"), ("remarks", "Remarks"),
+    ("sim_provider", "SIM Provider"), ("sim_mobile_number", "SIM Mobile Number"),
+    ("sim_type", "SIM Type"), ("sim_ownership", "SIM Ownership"), ("sim_purpose", "SIM Purpose")
+]
+ASSIGNMENT_IMPORT_COLUMNS = (
+    ["Employee ID", "Employee Email", "Asset ID", "Asset Serial Number", "Assigned Date"]
+    + [column for _, column in ASSIGNMENT_OPTIONAL_COLUMNS]
+)
+
+# kind -> (sheet title, header row, sample rows)
+TEMPLATES = {
+    "employees": ("Employees Template", EMPLOYEE_IMPORT_COLUMNS, [
+        ["John Smith", "IT", "Software Engineer", "john.smith@example.com", "2024-01-15", "Active"]
+    ]),
+    "assets": ("Assets Template", ASSET_IMPORT_COLUMNS, [
+        ["Dell Laptop", "Electronics", "Dell", "DL123456", "", "New", "Available"],
+        ["iPhone 15", "Mobile", "Apple", "356789012345678", "356789012345679", "New", "Available"]
+    ]),
+    "assignments": ("Assignments Template", ASSIGNMENT_IMPORT_COLUMNS, [
+        ["EMP0001", "john@example.com", "AST0001", "SN123456", "2024-01-15", "", "New laptop for developer", "", "", "", "", ""],
+        ["", "jane@example.com", "", "356789012345678", "2024-01-16", "", "Mobile with SIM", "Jio", "9876543210", "Physical SIM", "With Employee", "Official number"]
+    ])
+}
+
+
+# kind -> (workbook bytes, ETag)
+_rendered: Dict[str, Tuple[bytes, str]] = {}
+
+
+def render_template(kind: str) -> bytes:
+    title, headers, samples = TEMPLATES[kind]
+    wb = Workbook()
+    ws = wb.active
+    ws.title = title
+    ws.append(headers)
+    for row in samples:
+        ws.append(row)
+
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+async def rendered_template(kind: str) -> Tuple[bytes, str]:
+    if kind not in _rendered:
+        content = await offload.run(render_template, kind)
+        _rendered[kind] = (content, '"' + hashlib.sha1(content).hexdigest()[:16] + '"')
+    return _rendered[kind]
+
+
+async def template_response(request: Request, kind: str) -> Response:
+    content, etag = await rendered_template(kind)
+    headers = {
+        "Content-Disposition": f"attachment; filename={kind}_template.xlsx",
+        "Cache-Control": f"private, max-age={TEMPLATE_MAX_AGE}",
+        "ETag": etag
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    # Response sets Content-Length from the body
+    return Response(content=content, media_type=XLSX_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,107 @@
+"""MongoDB index declarations and the reconciler that keeps a database in line with them.
+
+Used by the app on startup and by ``scripts/ensure_indexes.py``.
+"""
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# collection -> list of index specs. Every hot query in server.py should be covered here.
+INDEX_SPECS: Dict[str, List[dict]] = {
+    "users": [
+        {"name": "username_unique", "keys": [("username", ASCENDING)], "unique": True},
+    ],
+    "employees": [
+        {"name": "employee_id_unique", "keys": [("employee_id", ASCENDING)], "unique": True},
+        {"name": "email", "keys": [("email", ASCENDING)]},
+        {"name": "status", "keys": [("status", ASCENDING)]},
+        {"name": "department", "keys": [("department", ASCENDING)]},
+    ],
+    "assets": [
+        {"name": "asset_id_unique", "keys": [("asset_id", ASCENDING)], "unique": True},
+        {"name": "serial_number", "keys": [("serial_number", ASCENDING)]},
+        {"name": "imei_2", "keys": [("imei_2", ASCENDING)]},
+        {"name": "status", "keys": [("status", ASCENDING)]},
+        {"name": "category", "keys": [("category", ASCENDING)]},
+    ],
+    "assignments": [
+        {"name": "assignment_id_unique", "keys": [("assignment_id", ASCENDING)], "unique": True},
+        {"name": "employee_id_return_date", "keys": [("employee_id", ASCENDING), ("return_date", ASCENDING)]},
+        {"name": "asset_id_return_date", "keys": [("asset_id", ASCENDING), ("return_date", ASCENDING)]},
+    ],
+    "sim_connections": [
+        {"name": "sim_mobile_number_unique", "keys": [("sim_mobile_number", ASCENDING)], "unique": True},
+    ],
+}
+
+
+def _key_tuple(keys) -> tuple:
+    return tuple((field, direction if isinstance(direction, str) else int(direction)) for field, direction in keys)
+
+
+async def ensure_indexes(db, create_missing: bool = True, rebuild_drifted: bool = False) -> dict:
+    """Compare the declared indexes with what exists and fix what we are allowed to.
+
+    Returns a report with the ``ok``, ``created``, ``drifted``, ``rebuilt`` and ``failed``
+    indexes, each entry formatted as ``collection.index_name``.
+    """
+    report = {"ok": [], "created": [], "drifted": [], "rebuilt": [], "failed": []}
+
+    for collection_name, specs in INDEX_SPECS.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        existing_by_key = {_key_tuple(info["key"]): (name, info) for name, info in existing.items()}
+
+        for spec in specs:
+            label = f"{collection_name}.{spec['name']}"
+            unique = spec.get("unique", False)
+            key = _key_tuple(spec["keys"])
+            found = existing_by_key.get(key)
+            if found is None and spec["name"] in existing:
+                # Same name, different key: treat as drift on the declared name
+                found = (spec["name"], existing[spec["name"]])
+
+            try:
+                if found is None:
+                    if create_missing:
+                        await collection.create_index(spec["keys"], name=spec["name"], unique=unique)
+                        report["created"].append(label)
+                    else:
+                        report["drifted"].append(f"{label} (missing)")
+                    continue
+
+                existing_name, info = found
+                if _key_tuple(info["key"]) == key and bool(info.get("unique", False)) == unique:
+                    report["ok"].append(label)
+                    continue
+
+                report["drifted"].append(
+                    f"{label} (found {existing_name} key={list(info['key'])} unique={bool(info.get('unique', False))})"
+                )
+                if rebuild_drifted:
+                    await collection.drop_index(existing_name)
+                    await collection.create_index(spec["keys"], name=spec["name"], unique=unique)
+                    report["rebuilt"].append(label)
+            except OperationFailure as e:
+                report["failed"].append(f"{label}: {e}")
+
+    return report
+
+
+def log_index_report(report: dict):
+    for label in report["created"]:
+        logger.warning(f"Index missing, created: {label}")
+    for label in report["drifted"]:
+        logger.warning(f"Index differs from declaration: {label}")
+    for label in report["rebuilt"]:
+        logger.warning(f"Index rebuilt: {label}")
+    for label in report["failed"]:
+        logger.error(f"Index could not be created: {label}")
+    logger.info(
+        f"Index check: {len(report['ok'])} ok, {len(report['created'])} created, "
+        f"{len(report['drifted'])} drifted, {len(report['failed'])} failed"
+    )
@@ -0,0 +1,71 @@
+"""Event-loop lag sampling.
+
+A background task asks to wake up every ``LOOP_LAG_INTERVAL`` seconds and
+records how late it actually woke. Lag near zero means the loop is free. A
+large lag means something blocked it, such as an openpyxl call still running
+on the loop, for roughly that long.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Optional
+
+LOOP_LAG_INTERVAL = float(os.environ.get('LOOP_LAG_INTERVAL', 0.5))
+# Lag above this is counted as a stall and logged
+LOOP_LAG_STALL_SECONDS = float(os.environ.get('LOOP_LAG_STALL_SECONDS', 0.1))
+# Samples kept for the recent percentiles
+LOOP_LAG_WINDOW = 600
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float, stall_seconds: float, window: int):
+        self.interval = interval
+        self.stall_seconds = stall_seconds
+        self._samples = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self.max_lag = 0.0
+        self.stalls = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - expected, 0.0)
+            self._samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.stall_seconds:
+                self.stalls += 1
+                logger.warning(f"Event loop was blocked for {lag * 1000:.0f} ms")
+
+    def stats(self) -> dict:
+        samples = sorted(self._samples)
+
+        def percentile(fraction):
+            return round(samples[min(int(len(samples) * fraction), len(samples) - 1)] * 1000, 1) if samples else 0.0
+
+        return {
+            "interval_ms": round(self.interval * 1000),
+            "samples": len(samples),
+            "last_ms": round(self._samples[-1] * 1000, 1) if samples else 0.0,
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max_lag * 1000, 1),
+            "stalls": self.stalls,
+            "stall_threshold_ms": round(self.stall_seconds * 1000)
+        }
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+loop_monitor = LoopLagMonitor(LOOP_LAG_INTERVAL, LOOP_LAG_STALL_SECONDS, LOOP_LAG_WINDOW)
@@ -0,0 +1,102 @@
+"""Password hashing off the event loop.
+
+bcrypt is deliberately slow (~200 ms per check at the default cost), so login
+verification runs in a process pool sized to the CPU count. The workers are
+started through a forkserver rather than forked from the API process, which by
+the first login already runs Motor's and the offload pool's threads; a child
+forked from a multithreaded process can deadlock on a lock one of them held.
+
+A semaphore caps how many checks may be queued on the pool at once; callers
+beyond that wait on the event loop, and ``stats()`` reports how many are waiting.
+
+Changing ``BCRYPT_ROUNDS`` makes every existing hash with a different cost "need
+update", and login rehashes such passwords transparently.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+# Hash/verify calls allowed on the pool at the same time
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', PASSWORD_HASH_WORKERS * 2))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+# Run inside the worker processes
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, concurrency: int):
+        self.workers = workers
+        self.concurrency = concurrency
+        self._executor = None
+        self._semaphore = None
+        self.waiting = 0
+        self.running = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.total_seconds = 0.0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("forkserver"))
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._executor
+
+    async def _run(self, func, *args):
+        executor = self._pool()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.total_seconds += time.perf_counter() - started
+            self._semaphore.release()
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """(valid, new_hash); new_hash is set when the stored hash should be replaced."""
+        return await self._run(_verify_and_update, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "concurrency_limit": self.concurrency,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "in_flight": self.running,
+            "completed": self.completed,
+            "avg_ms": round(self.total_seconds * 1000 / self.completed, 1) if self.completed else 0.0,
+            "bcrypt_rounds": BCRYPT_ROUNDS
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_CONCURRENCY)
@@ -0,0 +1,70 @@
+"""Revocation of issued login tokens.
+
+A JWT is valid until it expires, and ``get_current_user`` trusts the role and
+employee_id inside it (and caches them, see ``TOKEN_CACHE_SIZE``). Whoever changes
+a user's role or employee link therefore also sets ``tokens_valid_after`` on the
+user document (``revocation_marker()``): tokens issued before that second are
+refused, and the user logs in again to get a token with the new claims.
+
+The API keeps the markers in memory and reloads them from ``users`` every
+``TOKEN_REVOCATION_REFRESH`` seconds, so a change made by a script takes effect
+within that time without a database read per request.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+TOKEN_REVOCATION_REFRESH = float(os.environ.get('TOKEN_REVOCATION_REFRESH', 30))
+
+logger = logging.getLogger(__name__)
+
+
+def revocation_marker() -> dict:
+    """Fields to $set along with a role or employee_id change, revoking the user's tokens."""
+    return {"tokens_valid_after": int(time.time())}
+
+
+class TokenRevocations:
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        # username -> tokens issued before this (epoch seconds) are refused
+        self._valid_after: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def is_revoked(self, username: str, issued_at: Optional[int]) -> bool:
+        valid_after = self._valid_after.get(username)
+        return valid_after is not None and (issued_at is None or issued_at < valid_after)
+
+    async def refresh(self, db) -> List[str]:
+        """Reload the markers. Returns the usernames whose marker is new or moved."""
+        changed = []
+        cursor = db.users.find({"tokens_valid_after": {"$exists": True}}, {"_id": 0, "username": 1, "tokens_valid_after": 1})
+        async for user in cursor:
+            if self._valid_after.get(user["username"]) != user["tokens_valid_after"]:
+                self._valid_after[user["username"]] = user["tokens_valid_after"]
+                changed.append(user["username"])
+        return changed
+
+    def start(self, db, on_revoke: Callable[[str], object]):
+        """Refresh now and then every refresh_interval, calling on_revoke(username) for each change."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(db, on_revoke))
+
+    async def _run(self, db, on_revoke: Callable[[str], object]):
+        while True:
+            try:
+                for username in await self.refresh(db):
+                    on_revoke(username)
+            except Exception as e:
+                logger.warning(f"Reloading token revocations failed: {str(e)}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+token_revocations = TokenRevocations(TOKEN_REVOCATION_REFRESH)
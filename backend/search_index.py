@@ -0,0 +1,228 @@
+"""In-process typeahead index over employees and assets.
+
+Each searchable field keeps three postings maps: its whole values, the words
+inside them and their trigrams, each pointing back at the documents that contain
+them. Values and words are also kept in sorted lists so a prefix query is a
+``bisect`` followed by a walk over the matching terms. A query of three or more
+characters also matches anywhere inside a value: the smallest of its trigram
+postings gives the candidates, which are then checked for the substring, so the
+results are those the old case-insensitive ``$regex`` gave without touching Mongo.
+
+Matches are collected tier by tier (exact value, value prefix, word prefix,
+substring) and field by field, and collection stops as soon as ``limit``
+documents are found, so the cost of a search depends on ``limit`` and not on how
+many documents match.
+
+The index lives in the API process: it is built on startup and every write
+endpoint in server.py keeps it current. Until the first build finishes ``ready``
+is False and callers fall back to Mongo.
+"""
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+WORD_SPLIT = re.compile(r"[\s\-_./@]+")
+
+
+def normalize(value) -> str:
+    return str(value).strip().lower() if value is not None else ""
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def words(value: str) -> set:
+    """The words inside a value, not counting the value itself."""
+    return {word for word in WORD_SPLIT.split(value) if word} - {value}
+
+
+class TermPostings:
+    """term -> keys, plus the distinct terms in sorted order for prefix walks."""
+
+    def __init__(self):
+        self.postings: Dict[str, set] = {}
+        self.terms: List[str] = []
+
+    def add(self, term: str, key: str, bulk: bool = False):
+        """With ``bulk``, new terms are appended unsorted; call ``sort`` once the batch is in."""
+        keys = self.postings.get(term)
+        if keys is None:
+            keys = self.postings[term] = set()
+            if bulk:
+                self.terms.append(term)
+            else:
+                insort(self.terms, term)
+        keys.add(key)
+
+    def discard(self, term: str, key: str):
+        keys = self.postings.get(term)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self.postings[term]
+            del self.terms[bisect_left(self.terms, term)]
+
+    def sort(self):
+        self.terms.sort()
+
+    def with_prefix(self, prefix: str) -> Iterator[Tuple[str, set]]:
+        terms = self.terms
+        position = bisect_left(terms, prefix)
+        while position < len(terms) and terms[position].startswith(prefix):
+            yield terms[position], self.postings[terms[position]]
+            position += 1
+
+
+class FieldIndex:
+    def __init__(self):
+        self.values = TermPostings()
+        self.words = TermPostings()
+        # trigram -> keys
+        self.grams: Dict[str, set] = {}
+
+    def add(self, key: str, value: str, bulk: bool = False):
+        self.values.add(value, key, bulk)
+        for word in words(value):
+            self.words.add(word, key, bulk)
+        for gram in trigrams(value):
+            self.grams.setdefault(gram, set()).add(key)
+
+    def discard(self, key: str, value: str):
+        self.values.discard(value, key)
+        for word in words(value):
+            self.words.discard(word, key)
+        for gram in trigrams(value):
+            keys = self.grams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.grams[gram]
+
+    def sort(self):
+        self.values.sort()
+        self.words.sort()
+
+
+class SearchIndex:
+    def __init__(self, kinds: Dict[str, Tuple[str, List[str]]]):
+        """``kinds`` maps a name (e.g. "employees") to its key field and searchable fields."""
+        self.kinds = kinds
+        self.ready = False
+        self._documents: Dict[str, Dict[str, dict]] = {kind: {} for kind in kinds}
+        # kind -> key -> field -> normalized value
+        self._values: Dict[str, Dict[str, Dict[str, str]]] = {kind: {} for kind in kinds}
+        # kind -> field -> postings
+        self._fields: Dict[str, Dict[str, FieldIndex]] = {
+            kind: {field: FieldIndex() for field in fields} for kind, (_, fields) in kinds.items()
+        }
+
+    def _add(self, kind: str, key: str, document: dict, bulk: bool = False):
+        self._documents[kind][key] = {k: v for k, v in document.items() if k != "_id"}
+        values = self._values[kind][key] = {}
+        for field, field_index in self._fields[kind].items():
+            value = normalize(document.get(field))
+            if value:
+                values[field] = value
+                field_index.add(key, value, bulk)
+
+    def _discard(self, kind: str, key: str):
+        self._documents[kind].pop(key, None)
+        for field, value in self._values[kind].pop(key, {}).items():
+            self._fields[kind][field].discard(key, value)
+
+    def load(self, kind: str, documents: Iterable[dict]):
+        self._documents[kind] = {}
+        self._values[kind] = {}
+        self._fields[kind] = {field: FieldIndex() for field in self.kinds[kind][1]}
+        self.upsert_many(kind, documents)
+
+    def upsert(self, kind: str, document: dict):
+        key = document[self.kinds[kind][0]]
+        if key in self._documents[kind]:
+            self._discard(kind, key)
+        self._add(kind, key, document)
+
+    def upsert_many(self, kind: str, documents: Iterable[dict]):
+        """Add or replace a batch (e.g. the rows of an import), sorting the term lists once at the end."""
+        key_field = self.kinds[kind][0]
+        # The last document wins when a key repeats, as with one upsert after another
+        batch = {document[key_field]: document for document in documents}
+        # Discard what the batch replaces while the term lists are still sorted: bulk adds
+        # leave them unsorted until the end, and discard bisects them
+        for key in batch:
+            if key in self._documents[kind]:
+                self._discard(kind, key)
+        for key, document in batch.items():
+            self._add(kind, key, document, bulk=True)
+        for field_index in self._fields[kind].values():
+            field_index.sort()
+
+    def patch(self, kind: str, key: str, changes: dict):
+        """Apply a partial update (e.g. an asset status change) to an indexed document."""
+        previous = self._documents[kind].get(key)
+        if previous is None:
+            return
+        document = {**previous, **changes}
+        if all(normalize(document.get(field)) == self._values[kind][key].get(field, "") for field in self._fields[kind]):
+            # No searchable field changed, so the postings stay as they are
+            self._documents[kind][key] = document
+        else:
+            self.upsert(kind, document)
+
+    def remove(self, kind: str, key: str):
+        if key in self._documents[kind]:
+            self._discard(kind, key)
+
+    def search(self, kind: str, query: str, fields: Optional[List[str]] = None, limit: int = 10) -> List[dict]:
+        """Up to ``limit`` matches for ``query`` in ``fields`` (all indexed fields by default), best first.
+
+        Ranking: exact value, then value prefix, then word prefix, then (for queries of
+        three or more characters) any substring; ties go to the earlier field in
+        ``fields`` and then the shorter value. Within the tier and field where the page
+        fills up, the matches kept are the first ones found in term order, not
+        necessarily the shortest of all.
+        """
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+        field_indexes = [(field, self._fields[kind][field]) for field in fields or self.kinds[kind][1]]
+        values = self._values[kind]
+        best = {}
+
+        def collect(score: int, position: int, keys: Iterable[str], field: str) -> bool:
+            """Record keys not found yet; True once the page is full."""
+            for key in keys:
+                if key not in best:
+                    best[key] = (score, position, len(values[key][field]))
+                    if len(best) >= limit:
+                        return True
+            return False
+
+        def matches() -> Iterator[Tuple[int, int, Iterable[str], str]]:
+            for position, (field, field_index) in enumerate(field_indexes):
+                yield 0, position, field_index.values.postings.get(query, ()), field
+            for position, (field, field_index) in enumerate(field_indexes):
+                for term, keys in field_index.values.with_prefix(query):
+                    if term != query:
+                        yield 1, position, keys, field
+            for position, (field, field_index) in enumerate(field_indexes):
+                for _, keys in field_index.words.with_prefix(query):
+                    yield 2, position, keys, field
+            if len(query) >= 3:
+                for position, (field, field_index) in enumerate(field_indexes):
+                    postings = [field_index.grams.get(gram) for gram in trigrams(query)]
+                    if all(postings):
+                        candidates = min(postings, key=len)
+                        yield 3, position, (key for key in candidates if query in values[key][field]), field
+
+        for score, position, keys, field in matches():
+            if collect(score, position, keys, field):
+                break
+
+        documents = self._documents[kind]
+        return [dict(documents[key]) for key in sorted(best, key=lambda key: (best[key], key))]
+
+    def stats(self) -> dict:
+        return {kind: len(documents) for kind, documents in self._documents.items()}
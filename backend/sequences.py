@@ -0,0 +1,77 @@
+"""Atomic ID allocation for EMP/AST/ASG identifiers.
+
+Each sequence is a document in the ``counters`` collection that is bumped with
+``find_one_and_update`` + ``$inc``, so allocation is a single round trip no matter
+how big the collection is and two writers can never receive the same number.
+"""
+import re
+from typing import Iterable, List, Optional
+
+from pymongo import ReturnDocument
+
+# sequence name -> (collection, id field, prefix)
+SEQUENCES = {
+    "employees": ("employees", "employee_id", "EMP"),
+    "assets": ("assets", "asset_id", "AST"),
+    "assignments": ("assignments", "assignment_id", "ASG"),
+}
+
+
+def format_id(name: str, number: int) -> str:
+    prefix = SEQUENCES[name][2]
+    return f"{prefix}{str(number).zfill(4)}"
+
+
+def parse_id(name: str, value) -> Optional[int]:
+    """The number in an ID of sequence ``name`` (e.g. 57 for "ASG0057"), or None for other values."""
+    match = re.match(rf"^{SEQUENCES[name][2]}(\d+)$", value or "")
+    return int(match.group(1)) if match else None
+
+
+async def raise_sequence(db, name: str, ids: Iterable[str]):
+    """Move the counter up to the highest of ``ids`` that it doesn't cover yet.
+
+    For IDs that were not allocated here, such as the ones an import file brings,
+    so ``reserve_ids`` never hands them out again.
+    """
+    highest = max((number for number in (parse_id(name, value) for value in ids) if number is not None), default=0)
+    if highest:
+        await db.counters.update_one({"_id": name}, {"$max": {"seq": highest}}, upsert=True)
+
+
+async def reserve_ids(db, name: str, count: int = 1) -> List[str]:
+    """Reserve ``count`` consecutive IDs for ``name`` in one round trip."""
+    if count <= 0:
+        return []
+    counter = await db.counters.find_one_and_update(
+        {"_id": name},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    last = counter["seq"]
+    return [format_id(name, number) for number in range(last - count + 1, last + 1)]
+
+
+async def next_id(db, name: str) -> str:
+    return (await reserve_ids(db, name, 1))[0]
+
+
+async def seed_sequences(db) -> dict:
+    """Create missing counters, starting after the highest ID already in use.
+
+    Existing counters are never moved backwards (``$max``), so this is safe to run on
+    every startup. Returns the current value of each counter.
+    """
+    values = {}
+    for name, (collection_name, field, prefix) in SEQUENCES.items():
+        counter = await db.counters.find_one({"_id": name})
+        if counter is None:
+            highest = 0
+            cursor = db[collection_name].find({field: {"$regex": f"^{prefix}\\d+$"}}, {"_id": 0, field: 1})
+            async for doc in cursor:
+                highest = max(highest, parse_id(name, doc.get(field)) or 0)
+            await db.counters.update_one({"_id": name}, {"$max": {"seq": highest}}, upsert=True)
+            counter = await db.counters.find_one({"_id": name})
+        values[name] = counter["seq"]
+    return values
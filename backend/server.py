@@ -1,20 +1,37 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Query, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import re
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from typing import IO, List, Optional
 from datetime import datetime, timezone, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi.responses import StreamingResponse
-from openpyxl import Workbook, load_workbook
-from io import BytesIO
-import pandas as pd
+from pymongo import InsertOne, UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from cache import MISSING, ExpiringLRUCache, TTLCache
+from dashboard_stats import dashboard_figures, increment_stats, read_stats, reconcile_stats, status_move
+from etags import CollectionVersions, etag_matches
+from fast_json import model_projection, trusted_response
+from executors import offload
+from exports import export_response, json_array_response
+from import_templates import (
+    ASSET_REQUIRED_COLUMNS, ASSIGNMENT_OPTIONAL_COLUMNS, EMPLOYEE_IMPORT_COLUMNS, template_response
+)
+from import_jobs import ImportJob, format_row_errors, import_jobs
+from indexes import ensure_indexes, log_index_report
+from loop_monitor import loop_monitor
+from passwords import password_hasher
+from revocations import token_revocations
+from search_index import SearchIndex
+from spreadsheets import RowReader, cell_text, open_reader, spool_upload
+from sequences import next_id, raise_sequence, reserve_ids, seed_sequences
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -26,39 +43,215 @@ db = client[os.environ['DB_NAME']]
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
+# The search index, import jobs, dashboard and token caches and ETag versions all live in
+# this process, so the API runs as one worker; the thread and process pools are how it
+# uses more cores
+API_WORKERS = int(os.environ.get('WEB_CONCURRENCY', 1))
+
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-security = HTTPBearer()
+# Page size for the list endpoints when no limit is given, and the largest allowed
+LIST_PAGE_SIZE = 1000
+LIST_MAX_PAGE_SIZE = 5000
+
+# Decoded JWT claims kept in memory, keyed by token, until the token expires
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+
+# Seconds a computed /dashboard/stats result may be served from memory
+DASHBOARD_CACHE_TTL = float(os.environ.get('DASHBOARD_CACHE_TTL', 30))
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Number of documents sent per insert_many during imports
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+search_index = SearchIndex({
+    "employees": ("employee_id", ["full_name", "employee_id", "department"]),
+    "assets": ("asset_id", ["asset_name", "category", "serial_number", "imei_2", "asset_id"]),
+})
+
+dashboard_cache = TTLCache(DASHBOARD_CACHE_TTL)
+token_cache = ExpiringLRUCache(TOKEN_CACHE_SIZE)
+collection_versions = CollectionVersions()
+
+security = HTTPBearer()
 
 def create_access_token(data: dict):
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    issued = datetime.now(timezone.utc)
+    expire = issued + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # iat lets a role change revoke tokens issued before it (see revocations.py)
+    to_encode.update({"exp": expire, "iat": issued})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    token = credentials.credentials
+    cached = token_cache.get(token)
+    if cached is not MISSING:
+        return dict(cached)
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         role: str = payload.get("role")
         employee_id: str = payload.get("employee_id")
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        return {"username": username, "role": role, "employee_id": employee_id}
+        if token_revocations.is_revoked(username, payload.get("iat")):
+            raise HTTPException(status_code=401, detail="Session expired, please log in again")
+        user = {"username": username, "role": role, "employee_id": employee_id}
+        # Tokens without exp are not cached; jwt.decode has already rejected expired ones
+        if payload.get("exp"):
+            token_cache.set(token, user, expires_at=payload["exp"], owner=username)
+        return dict(user)
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
 
+def revoke_cached_tokens(username: str) -> int:
+    """Forget the verified claims of every cached token for username, so their next request
+    decodes the token again and meets the revocation check. Called by token_revocations
+    whenever a user's tokens_valid_after moves."""
+    return token_cache.revoke_owner(username)
+
+async def mark_changed(*collections: str, **stat_changes):
+    """Call from every write endpoint once the write is done, so data derived from those
+    collections is refreshed. Applies the write's dashboard counter deltas, if any (see
+    increment_stats), in one update."""
+    collection_versions.bump(*collections)
+    await increment_stats(db, **stat_changes)
+    if "assets" in collections or "employees" in collections:
+        dashboard_cache.invalidate()
+
+async def insert_in_batches(collection, documents: List[dict], row_numbers: List[int], row_errors: List[tuple], job: Optional[ImportJob] = None) -> List[dict]:
+    """insert_many in IMPORT_BATCH_SIZE chunks; failed documents are reported as (row number, message).
+    Returns the documents that were inserted. Each finished batch is counted on job, if given."""
+    inserted = []
+    for start in range(0, len(documents), IMPORT_BATCH_SIZE):
+        batch = documents[start:start + IMPORT_BATCH_SIZE]
+        try:
+            await collection.insert_many(batch, ordered=False)
+            inserted.extend(batch)
+        except BulkWriteError as e:
+            failed = set()
+            for write_error in e.details.get("writeErrors", []):
+                failed.add(write_error["index"])
+                row_number = row_numbers[start + write_error["index"]]
+                row_errors.append((row_number, write_error.get('errmsg', 'Write failed')))
+            inserted.extend(document for position, document in enumerate(batch) if position not in failed)
+        if job is not None:
+            job.advance(len(batch))
+    return inserted
+
+async def open_sheet(job: ImportJob, upload: IO[bytes]) -> RowReader:
+    reader = await offload.run(open_reader, upload, IMPORT_BATCH_SIZE)
+    job.rows_total = reader.estimated_rows
+    return reader
+
+async def sheet_chunks(job: ImportJob, reader: RowReader):
+    """IMPORT_BATCH_SIZE rows at a time, each parsed off the event loop when the previous one is done."""
+    chunks = reader.chunks()
+    while True:
+        chunk = await offload.run(next, chunks, None)
+        if chunk is None:
+            break
+        yield chunk
+    reader.close()
+    job.rows_total = job.rows_processed
+
+def regex_query(q: str, fields: List[str]) -> dict:
+    """Case-insensitive substring match on any of fields, with q taken literally."""
+    pattern = re.escape(q.strip())
+    return {"$or": [{field: {"$regex": pattern, "$options": "i"}} for field in fields]}
+
+async def search_documents(kind: str, q: str, fields: List[str], limit: int) -> List[dict]:
+    """Typeahead lookup through the in-memory index, or Mongo while it is still building."""
+    if search_index.ready:
+        return search_index.search(kind, q, fields, limit)
+    return await db[kind].find(regex_query(q, fields), {"_id": 0}).to_list(limit)
+
+async def update_asset_fields(asset_id: str, fields: dict) -> dict:
+    """Set fields on an asset and keep the search index in step. Returns the dashboard
+    status delta, for the caller to pass to mark_changed with the rest of its changes."""
+    previous = await db.assets.find_one_and_update(
+        {"asset_id": asset_id},
+        {"$set": fields},
+        projection={"_id": 0, "status": 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    search_index.patch("assets", asset_id, fields)
+    if previous is None or "status" not in fields:
+        return {}
+    return status_move(previous.get("status"), fields["status"])
+
+def filter_value(value: Optional[str]) -> Optional[str]:
+    """Treat empty and 'all' filter params the same as not filtering."""
+    if value is None or value.strip() == "" or value.lower() == "all":
+        return None
+    return value
+
+def check_not_modified(request: Request, response: Response, *collections: str) -> Optional[Response]:
+    """Tag the response with the current versions of collections. Returns a 304 response
+    when the client's If-None-Match already has that tag; call before querying."""
+    etag = collection_versions.etag(*collections)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+async def fetch_page(collection, model: type, query: dict, id_field: str, limit: int, after: Optional[str], include_total: bool, response: Response) -> Response:
+    """Keyset pagination on id_field, returning the page as model through the fast JSON path.
+    Sets X-Next-Cursor when more documents may follow and, if asked, X-Total-Count with the
+    number of documents matching query."""
+    page_query = dict(query)
+    if after:
+        page_query[id_field] = {"$gt": after}
+    
+    page = collection.find(page_query, model_projection(model)).sort(id_field, 1).limit(limit).to_list(limit)
+    if include_total:
+        documents, total = await asyncio.gather(page, collection.count_documents(query))
+        response.headers["X-Total-Count"] = str(total)
+    else:
+        documents = await page
+    
+    if len(documents) == limit:
+        response.headers["X-Next-Cursor"] = documents[-1][id_field]
+    # Headers set on the injected response are not copied onto a returned Response
+    return trusted_response(model, documents, headers=dict(response.headers))
+
+async def active_assignments_by(field: str, values: List[str]) -> dict:
+    """Unreturned assignments for all of values in one query, grouped by field."""
+    grouped = {}
+    if not values:
+        return grouped
+    cursor = db.assignments.find({field: {"$in": values}, "return_date": None}, {"_id": 0})
+    async for assignment in cursor:
+        grouped.setdefault(assignment[field], []).append(assignment)
+    return grouped
+
+# (header, field) pairs for the spreadsheet exports
+EMPLOYEE_EXPORT_COLUMNS = [
+    ("Employee ID", "employee_id"), ("Full Name", "full_name"), ("Department", "department"),
+    ("Designation", "designation"), ("Email", "email"), ("Date of Joining", "date_of_joining"), ("Status", "status")
+]
+ASSET_EXPORT_COLUMNS = [
+    ("Asset ID", "asset_id"), ("Asset Name", "asset_name"), ("Category", "category"), ("Brand", "brand"),
+    ("Serial Number / IMEI 1", "serial_number"), ("IMEI 2", "imei_2"), ("Condition", "condition"), ("Status", "status")
+]
+ASSIGNMENT_EXPORT_COLUMNS = [
+    ("Assignment ID", "assignment_id"), ("Employee ID", "employee_id"), ("Employee Name", "employee_name"),
+    ("Asset ID", "asset_id"), ("Asset Name", "asset_name"), ("Assigned Date", "assigned_date"),
+    ("Return Date", "return_date"), ("Remarks", "remarks"),
+    ("SIM Provider", "sim_provider"), ("SIM Mobile Number", "sim_mobile_number"), ("SIM Type", "sim_type"),
+    ("SIM Ownership", "sim_ownership"), ("SIM Purpose", "sim_purpose")
+]
+SIM_CONNECTION_EXPORT_COLUMNS = [
+    ("SIM Provider", "sim_provider"), ("SIM Mobile Number", "sim_mobile_number"), ("SIM Type", "sim_type"),
+    ("SIM Ownership", "sim_ownership"), ("SIM Purpose", "sim_purpose"), ("Employee Name", "employee_name"),
+    ("Asset Name", "asset_name"), ("Assigned Date", "assigned_date"), ("Return Date", "return_date")
+]
+
 class LoginRequest(BaseModel):
     username: str
     password: str
@@ -167,8 +360,15 @@ class PendingReturn(BaseModel):
 @api_router.post("/auth/login", response_model=LoginResponse)
 async def login(login_req: LoginRequest):
     user = await db.users.find_one({"username": login_req.username}, {"_id": 0})
-    if not user or not verify_password(login_req.password, user["password"]):
+    if not user:
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    
+    # bcrypt runs in the worker pool; new_hash is set when the stored cost factor is outdated
+    valid, new_hash = await password_hasher.verify_and_update(login_req.password, user["password"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
+    if new_hash:
+        await db.users.update_one({"username": user["username"]}, {"$set": {"password": new_hash}})
     
     token_data = {
         "sub": user["username"],
@@ -184,6 +384,18 @@ async def login(login_req: LoginRequest):
         "employee_id": user.get("employee_id")
     }
 
+@api_router.get("/auth/hash-stats")
+async def get_password_hash_stats(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] not in ["HR", "Admin"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return password_hasher.stats()
+
+@api_router.get("/auth/token-cache")
+async def get_token_cache_stats(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] not in ["HR", "Admin"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return token_cache.stats()
+
 @api_router.get("/auth/me")
 async def get_me(current_user: dict = Depends(get_current_user)):
     return current_user
@@ -193,58 +405,54 @@ async def global_search(q: str, current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    results = {"employees": [], "assets": []}
-    
     # Search employees
-    employee_query = {
-        "$or": [
-            {"full_name": {"$regex": q, "$options": "i"}},
-            {"employee_id": {"$regex": q, "$options": "i"}}
-        ]
-    }
-    employees = await db.employees.find(employee_query, {"_id": 0}).to_list(10)
-    
-    for employee in employees:
-        assignments = await db.assignments.find(
-            {"employee_id": employee["employee_id"], "return_date": None},
-            {"_id": 0}
-        ).to_list(100)
-        employee["assigned_assets"] = assignments
-    
-    results["employees"] = employees
+    async def search_employees_half():
+        employees = await search_documents("employees", q, ["full_name", "employee_id"], 10)
+        
+        assignments = await active_assignments_by("employee_id", [e["employee_id"] for e in employees])
+        for employee in employees:
+            employee["assigned_assets"] = assignments.get(employee["employee_id"], [])[:100]
+        return employees
     
     # Search assets
-    asset_query = {
-        "$or": [
-            {"asset_name": {"$regex": q, "$options": "i"}},
-            {"category": {"$regex": q, "$options": "i"}},
-            {"serial_number": {"$regex": q, "$options": "i"}},
-            {"imei_2": {"$regex": q, "$options": "i"}},
-            {"asset_id": {"$regex": q, "$options": "i"}}
-        ]
-    }
-    assets = await db.assets.find(asset_query, {"_id": 0}).to_list(10)
-    
-    for asset in assets:
-        if asset["status"] == "Assigned":
-            assignment = await db.assignments.find_one(
-                {"asset_id": asset["asset_id"], "return_date": None},
-                {"_id": 0}
-            )
-            asset["assigned_to"] = assignment
-        else:
-            asset["assigned_to"] = None
+    async def search_assets_half():
+        assets = await search_documents("assets", q, ["asset_name", "category", "serial_number", "imei_2", "asset_id"], 10)
+        
+        assignments = await active_assignments_by("asset_id", [a["asset_id"] for a in assets if a["status"] == "Assigned"])
+        for asset in assets:
+            current = assignments.get(asset["asset_id"]) if asset["status"] == "Assigned" else None
+            asset["assigned_to"] = current[0] if current else None
+        return assets
     
-    results["assets"] = assets
+    employees, assets = await asyncio.gather(search_employees_half(), search_assets_half())
     
-    return results
+    return {"employees": employees, "assets": assets}
 
 @api_router.get("/employees", response_model=List[Employee])
-async def get_employees(current_user: dict = Depends(get_current_user)):
+async def get_employees(
+    request: Request,
+    response: Response,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=LIST_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    department: Optional[str] = None,
+    status: Optional[str] = None,
+    includeTotal: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
-    employees = await db.employees.find({}, {"_id": 0}).to_list(1000)
-    return employees
+    
+    not_modified = check_not_modified(request, response, "employees")
+    if not_modified:
+        return not_modified
+    
+    query = {}
+    if filter_value(department):
+        query["department"] = department
+    if filter_value(status):
+        query["status"] = status
+    
+    return await fetch_page(db.employees, Employee, query, "employee_id", limit, after, includeTotal, response)
 
 @api_router.get("/employees/me", response_model=Employee)
 async def get_my_profile(current_user: dict = Depends(get_current_user)):
@@ -260,118 +468,91 @@ async def create_employee(employee: EmployeeCreate, current_user: dict = Depends
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    count = await db.employees.count_documents({})
-    employee_id = f"EMP{str(count + 1).zfill(4)}"
+    employee_id = await next_id(db, "employees")
     
     employee_dict = employee.model_dump()
     employee_dict["employee_id"] = employee_id
     
     await db.employees.insert_one(employee_dict)
+    search_index.upsert("employees", employee_dict)
+    await mark_changed("employees", total_employees=1)
     return Employee(**employee_dict)
 
-@api_router.post("/employees/import")
+async def process_employees_import(job: ImportJob, upload: IO[bytes]) -> dict:
+    reader = await open_sheet(job, upload)
+    
+    required_columns = EMPLOYEE_IMPORT_COLUMNS
+    if not all(col in reader.columns for col in required_columns):
+        raise HTTPException(status_code=400, detail=f"File must contain columns: {', '.join(required_columns)}")
+    
+    row_errors = job.row_errors
+    imported_count = 0
+    
+    async for chunk in sheet_chunks(job, reader):
+        valid_rows = []
+        for row_number, row in chunk:
+            email = cell_text(row['Email']).strip()
+            if row['Email'] is None or not re.match(EMAIL_PATTERN, email):
+                row_errors.append((row_number, f"Invalid email '{cell_text(row['Email'])}'"))
+            else:
+                valid_rows.append((row_number, row, email))
+        job.advance(len(chunk) - len(valid_rows))
+        
+        employee_ids = await reserve_ids(db, "employees", len(valid_rows))
+        
+        employees = []
+        row_numbers = []
+        for employee_id, (row_number, row, email) in zip(employee_ids, valid_rows):
+            employees.append({
+                "employee_id": employee_id,
+                "full_name": cell_text(row['Full Name']),
+                "department": cell_text(row['Department']),
+                "designation": cell_text(row['Designation']),
+                "email": email,
+                "date_of_joining": cell_text(row['Date of Joining']),
+                "status": cell_text(row['Status'])
+            })
+            row_numbers.append(row_number)
+        
+        inserted = await insert_in_batches(db.employees, employees, row_numbers, row_errors, job)
+        search_index.upsert_many("employees", inserted)
+        imported_count += len(inserted)
+        await mark_changed("employees", total_employees=len(inserted))
+    
+    return {
+        "message": f"Successfully imported {imported_count} employees",
+        "imported": imported_count,
+        "errors": format_row_errors(row_errors)
+    }
+
+@api_router.post("/employees/import", status_code=202)
 async def import_employees(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    try:
-        contents = await file.read()
-        df = pd.read_excel(BytesIO(contents))
-        
-        required_columns = ['Full Name', 'Department', 'Designation', 'Email', 'Date of Joining', 'Status']
-        if not all(col in df.columns for col in required_columns):
-            raise HTTPException(status_code=400, detail=f"Excel file must contain columns: {', '.join(required_columns)}")
-        
-        imported_count = 0
-        errors = []
-        
-        for index, row in df.iterrows():
-            try:
-                count = await db.employees.count_documents({})
-                employee_id = f"EMP{str(count + 1).zfill(4)}"
-                
-                employee_data = {
-                    "employee_id": employee_id,
-                    "full_name": str(row['Full Name']),
-                    "department": str(row['Department']),
-                    "designation": str(row['Designation']),
-                    "email": str(row['Email']),
-                    "date_of_joining": str(row['Date of Joining']),
-                    "status": str(row['Status'])
-                }
-                
-                await db.employees.insert_one(employee_data)
-                imported_count += 1
-            except Exception as e:
-                errors.append(f"Row {index + 2}: {str(e)}")
-        
-        return {
-            "message": f"Successfully imported {imported_count} employees",
-            "imported": imported_count,
-            "errors": errors
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+    upload = await spool_upload(file)
+    job = import_jobs.submit("employees", file.filename, current_user["username"], process_employees_import, upload)
+    return job.to_dict()
 
 @api_router.get("/employees/export")
-async def export_employees(current_user: dict = Depends(get_current_user)):
+async def export_employees(format: str = "xlsx", current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    employees = await db.employees.find({}, {"_id": 0}).to_list(1000)
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Employees"
-    
-    headers = ["Employee ID", "Full Name", "Department", "Designation", "Email", "Date of Joining", "Status"]
-    ws.append(headers)
-    
-    for employee in employees:
-        ws.append([
-            employee.get("employee_id", ""),
-            employee.get("full_name", ""),
-            employee.get("department", ""),
-            employee.get("designation", ""),
-            employee.get("email", ""),
-            employee.get("date_of_joining", ""),
-            employee.get("status", "")
-        ])
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=employees.xlsx"}
+    return await export_response(
+        format,
+        db.employees.find({}, {"_id": 0}),
+        "Employees",
+        EMPLOYEE_EXPORT_COLUMNS,
+        "employees"
     )
 
 @api_router.get("/employees/template")
-async def download_employees_template(current_user: dict = Depends(get_current_user)):
+async def download_employees_template(request: Request, current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Employees Template"
-    
-    headers = ["Full Name", "Department", "Designation", "Email", "Date of Joining", "Status"]
-    ws.append(headers)
-    
-    # Add sample data
-    ws.append(["John Smith", "IT", "Software Engineer", "john.smith@example.com", "2024-01-15", "Active"])
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=employees_template.xlsx"}
-    )
+    return await template_response(request, "employees")
 
 @api_router.put("/employees/{employee_id}", response_model=Employee)
 async def update_employee(employee_id: str, employee: EmployeeCreate, current_user: dict = Depends(get_current_user)):
@@ -385,6 +566,8 @@ async def update_employee(employee_id: str, employee: EmployeeCreate, current_us
         raise HTTPException(status_code=404, detail="Employee not found")
     
     employee_dict["employee_id"] = employee_id
+    search_index.upsert("employees", employee_dict)
+    await mark_changed("employees")
     return Employee(**employee_dict)
 
 @api_router.delete("/employees/{employee_id}")
@@ -395,138 +578,161 @@ async def delete_employee(employee_id: str, current_user: dict = Depends(get_cur
     result = await db.employees.delete_one({"employee_id": employee_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Employee not found")
+    search_index.remove("employees", employee_id)
+    await mark_changed("employees", total_employees=-1)
     return {"message": "Employee deleted successfully"}
 
 @api_router.get("/assets", response_model=List[Asset])
-async def get_assets(current_user: dict = Depends(get_current_user)):
+async def get_assets(
+    request: Request,
+    response: Response,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=LIST_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    includeTotal: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
-    assets = await db.assets.find({}, {"_id": 0}).to_list(1000)
-    return assets
+    
+    not_modified = check_not_modified(request, response, "assets")
+    if not_modified:
+        return not_modified
+    
+    query = {}
+    if filter_value(category):
+        query["category"] = category
+    if filter_value(status):
+        query["status"] = status
+    
+    return await fetch_page(db.assets, Asset, query, "asset_id", limit, after, includeTotal, response)
 
 @api_router.post("/assets", response_model=Asset)
 async def create_asset(asset: AssetCreate, current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    count = await db.assets.count_documents({})
-    asset_id = f"AST{str(count + 1).zfill(4)}"
+    asset_id = await next_id(db, "assets")
     
     asset_dict = asset.model_dump()
     asset_dict["asset_id"] = asset_id
     
     await db.assets.insert_one(asset_dict)
+    search_index.upsert("assets", asset_dict)
+    await mark_changed("assets", total_assets=1, status_changes={asset_dict["status"]: 1})
     return Asset(**asset_dict)
 
-@api_router.post("/assets/import")
-async def import_assets(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
-    if current_user["role"] not in ["HR", "Admin"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    try:
-        contents = await file.read()
-        df = pd.read_excel(BytesIO(contents))
+async def process_assets_import(job: ImportJob, upload: IO[bytes]) -> dict:
+    reader = await open_sheet(job, upload)
+    
+    required_columns = ASSET_REQUIRED_COLUMNS
+    if not all(col in reader.columns for col in required_columns):
+        raise HTTPException(status_code=400, detail=f"File must contain columns: {', '.join(required_columns)}")
+    
+    row_errors = job.row_errors
+    imported_count = 0
+    # Serial / IMEI -> row that brought it, across the whole file
+    seen = {}
+    
+    async for chunk in sheet_chunks(job, reader):
+        identifiers_by_row = {}
+        for row_number, row in chunk:
+            identifiers_by_row[row_number] = [
+                str(value) for value in (row['Serial Number'], row.get('IMEI 2')) if value is not None
+            ]
         
-        required_columns = ['Asset Name', 'Category', 'Brand', 'Serial Number', 'Condition', 'Status']
-        if not all(col in df.columns for col in required_columns):
-            raise HTTPException(status_code=400, detail=f"Excel file must contain columns: {', '.join(required_columns)}")
+        # One query for every serial / IMEI in the chunk that is already on record
+        incoming = {value for identifiers in identifiers_by_row.values() for value in identifiers}
+        known = set()
+        if incoming:
+            cursor = db.assets.find(
+                {"$or": [{"serial_number": {"$in": list(incoming)}}, {"imei_2": {"$in": list(incoming)}}]},
+                {"_id": 0, "serial_number": 1, "imei_2": 1}
+            )
+            async for existing in cursor:
+                known.update(value for value in (existing.get("serial_number"), existing.get("imei_2")) if value)
         
-        imported_count = 0
-        errors = []
+        accepted_rows = []
+        for row_number, row in chunk:
+            identifiers = identifiers_by_row[row_number]
+            duplicate = next((value for value in identifiers if value in known), None)
+            if duplicate is not None:
+                row_errors.append((row_number, f"Serial number / IMEI {duplicate} already exists"))
+                continue
+            duplicate = next((value for value in identifiers if value in seen), None)
+            if duplicate is not None:
+                row_errors.append((row_number, f"Serial number / IMEI {duplicate} is duplicated in row {seen[duplicate]}"))
+                continue
+            for value in identifiers:
+                seen[value] = row_number
+            accepted_rows.append((row_number, row))
+        job.advance(len(chunk) - len(accepted_rows))
         
-        for index, row in df.iterrows():
-            try:
-                count = await db.assets.count_documents({})
-                asset_id = f"AST{str(count + 1).zfill(4)}"
-                
-                asset_data = {
-                    "asset_id": asset_id,
-                    "asset_name": str(row['Asset Name']),
-                    "category": str(row['Category']),
-                    "brand": str(row['Brand']),
-                    "serial_number": str(row['Serial Number']),
-                    "condition": str(row['Condition']),
-                    "status": str(row['Status'])
-                }
-                
-                # Add IMEI 2 if present
-                if 'IMEI 2' in df.columns and pd.notna(row.get('IMEI 2')):
-                    asset_data["imei_2"] = str(row['IMEI 2'])
-                
-                await db.assets.insert_one(asset_data)
-                imported_count += 1
-            except Exception as e:
-                errors.append(f"Row {index + 2}: {str(e)}")
+        asset_ids = await reserve_ids(db, "assets", len(accepted_rows))
         
-        return {
-            "message": f"Successfully imported {imported_count} assets",
-            "imported": imported_count,
-            "errors": errors
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+        assets = []
+        row_numbers = []
+        for asset_id, (row_number, row) in zip(asset_ids, accepted_rows):
+            asset_data = {
+                "asset_id": asset_id,
+                "asset_name": cell_text(row['Asset Name']),
+                "category": cell_text(row['Category']),
+                "brand": cell_text(row['Brand']),
+                "serial_number": None if row['Serial Number'] is None else str(row['Serial Number']),
+                "condition": cell_text(row['Condition']),
+                "status": cell_text(row['Status'])
+            }
+            
+            # Add IMEI 2 if present
+            if row.get('IMEI 2') is not None:
+                asset_data["imei_2"] = str(row['IMEI 2'])
+            
+            assets.append(asset_data)
+            row_numbers.append(row_number)
+        
+        inserted = await insert_in_batches(db.assets, assets, row_numbers, row_errors, job)
+        status_counts = {}
+        for asset_data in inserted:
+            status_counts[asset_data["status"]] = status_counts.get(asset_data["status"], 0) + 1
+        search_index.upsert_many("assets", inserted)
+        imported_count += len(inserted)
+        await mark_changed("assets", total_assets=len(inserted), status_changes=status_counts)
+    
+    return {
+        "message": f"Successfully imported {imported_count} assets",
+        "imported": imported_count,
+        "errors": format_row_errors(row_errors)
+    }
+
+@api_router.post("/assets/import", status_code=202)
+async def import_assets(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+    if current_user["role"] not in ["HR", "Admin"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    upload = await spool_upload(file)
+    job = import_jobs.submit("assets", file.filename, current_user["username"], process_assets_import, upload)
+    return job.to_dict()
 
 @api_router.get("/assets/export")
-async def export_assets(current_user: dict = Depends(get_current_user)):
+async def export_assets(format: str = "xlsx", current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    assets = await db.assets.find({}, {"_id": 0}).to_list(1000)
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Assets"
-    
-    headers = ["Asset ID", "Asset Name", "Category", "Brand", "Serial Number / IMEI 1", "IMEI 2", "Condition", "Status"]
-    ws.append(headers)
-    
-    for asset in assets:
-        ws.append([
-            asset.get("asset_id", ""),
-            asset.get("asset_name", ""),
-            asset.get("category", ""),
-            asset.get("brand", ""),
-            asset.get("serial_number", ""),
-            asset.get("imei_2", ""),
-            asset.get("condition", ""),
-            asset.get("status", "")
-        ])
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=assets.xlsx"}
+    return await export_response(
+        format,
+        db.assets.find({}, {"_id": 0}),
+        "Assets",
+        ASSET_EXPORT_COLUMNS,
+        "assets"
     )
 
 @api_router.get("/assets/template")
-async def download_assets_template(current_user: dict = Depends(get_current_user)):
+async def download_assets_template(request: Request, current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Assets Template"
-    
-    headers = ["Asset Name", "Category", "Brand", "Serial Number", "IMEI 2", "Condition", "Status"]
-    ws.append(headers)
-    
-    # Add sample data
-    ws.append(["Dell Laptop", "Electronics", "Dell", "DL123456", "", "New", "Available"])
-    ws.append(["iPhone 15", "Mobile", "Apple", "356789012345678", "356789012345679", "New", "Available"])
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=assets_template.xlsx"}
-    )
+    return await template_response(request, "assets")
 
 @api_router.put("/assets/{asset_id}", response_model=Asset)
 async def update_asset(asset_id: str, asset: AssetCreate, current_user: dict = Depends(get_current_user)):
@@ -534,12 +740,19 @@ async def update_asset(asset_id: str, asset: AssetCreate, current_user: dict = D
         raise HTTPException(status_code=403, detail="Access denied")
     
     asset_dict = asset.model_dump()
-    result = await db.assets.update_one({"asset_id": asset_id}, {"$set": asset_dict})
+    previous = await db.assets.find_one_and_update(
+        {"asset_id": asset_id},
+        {"$set": asset_dict},
+        projection={"_id": 0, "status": 1},
+        return_document=ReturnDocument.BEFORE
+    )
     
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Asset not found")
     
     asset_dict["asset_id"] = asset_id
+    search_index.upsert("assets", asset_dict)
+    await mark_changed("assets", status_changes=status_move(previous.get("status"), asset_dict["status"]))
     return Asset(**asset_dict)
 
 @api_router.delete("/assets/{asset_id}")
@@ -547,75 +760,105 @@ async def delete_asset(asset_id: str, current_user: dict = Depends(get_current_u
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    result = await db.assets.delete_one({"asset_id": asset_id})
-    if result.deleted_count == 0:
+    deleted = await db.assets.find_one_and_delete({"asset_id": asset_id}, projection={"_id": 0, "status": 1})
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Asset not found")
+    search_index.remove("assets", asset_id)
+    await mark_changed("assets", total_assets=-1, status_changes={deleted.get("status"): -1})
     return {"message": "Asset deleted successfully"}
 
 @api_router.get("/assignments", response_model=List[Assignment])
-async def get_assignments(current_user: dict = Depends(get_current_user)):
+async def get_assignments(
+    request: Request,
+    response: Response,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=LIST_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    employee_id: Optional[str] = None,
+    asset_id: Optional[str] = None,
+    status: Optional[str] = None,
+    includeTotal: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
-    assignments = await db.assignments.find({}, {"_id": 0}).to_list(1000)
-    return assignments
+    
+    not_modified = check_not_modified(request, response, "assignments")
+    if not_modified:
+        return not_modified
+    
+    query = {}
+    if filter_value(employee_id):
+        query["employee_id"] = employee_id
+    if filter_value(asset_id):
+        query["asset_id"] = asset_id
+    # 'active' = not yet returned, 'returned' = has a return date
+    if filter_value(status):
+        if status.lower() == "active":
+            query["return_date"] = None
+        elif status.lower() == "returned":
+            query["return_date"] = {"$ne": None}
+        else:
+            raise HTTPException(status_code=400, detail="status must be 'active' or 'returned'")
+    
+    return await fetch_page(db.assignments, Assignment, query, "assignment_id", limit, after, includeTotal, response)
 
 @api_router.get("/assignments/my", response_model=List[Assignment])
 async def get_my_assignments(current_user: dict = Depends(get_current_user)):
     if current_user["role"] == "Employee" and current_user["employee_id"]:
         assignments = await db.assignments.find(
             {"employee_id": current_user["employee_id"]},
-            {"_id": 0}
+            model_projection(Assignment)
         ).to_list(1000)
-        return assignments
+        return trusted_response(Assignment, assignments)
     raise HTTPException(status_code=403, detail="Access denied")
 
+def sim_connection_upsert(sim_mobile_number: str, sim_data: dict):
+    """Create the SIM connection or overwrite its fields, in one round trip."""
+    return db.sim_connections.update_one({"sim_mobile_number": sim_mobile_number}, {"$set": sim_data}, upsert=True)
+
 @api_router.post("/assignments", response_model=Assignment)
 async def create_assignment(assignment: AssignmentCreate, current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    employee = await db.employees.find_one({"employee_id": assignment.employee_id}, {"_id": 0})
+    # Independent lookups in one round trip; an ID reserved for a rejected request is simply skipped
+    employee, asset, assignment_id = await asyncio.gather(
+        db.employees.find_one({"employee_id": assignment.employee_id}, {"_id": 0}),
+        db.assets.find_one({"asset_id": assignment.asset_id}, {"_id": 0}),
+        next_id(db, "assignments")
+    )
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    asset = await db.assets.find_one({"asset_id": assignment.asset_id}, {"_id": 0})
     if not asset:
         raise HTTPException(status_code=404, detail="Asset not found")
     
     if asset["status"] == "Assigned":
         raise HTTPException(status_code=400, detail="Asset is already assigned")
     
-    count = await db.assignments.count_documents({})
-    assignment_id = f"ASG{str(count + 1).zfill(4)}"
-    
     assignment_dict = assignment.model_dump()
     assignment_dict["assignment_id"] = assignment_id
     assignment_dict["employee_name"] = employee["full_name"]
     assignment_dict["asset_name"] = asset["asset_name"]
     
+    # Insert first: if it fails, the asset and SIM must be left as they are
     await db.assignments.insert_one(assignment_dict)
-    await db.assets.update_one({"asset_id": assignment.asset_id}, {"$set": {"status": "Assigned"}})
+    
+    writes = []
     
     # Auto-create/update SIM Connection if mobile asset with SIM details
     if asset.get("category", "").lower() == "mobile" and assignment.sim_mobile_number:
-        sim_data = {
+        writes.append(sim_connection_upsert(assignment.sim_mobile_number, {
             "sim_mobile_number": assignment.sim_mobile_number,
             "current_owner_name": employee["full_name"],
             "connection_status": "Active",
             "sim_status": "Assigned" if assignment.sim_ownership == "With Employee" else "In Stock",
             "remarks": assignment.sim_purpose or ""
-        }
-        
-        # Check if SIM already exists
-        existing_sim = await db.sim_connections.find_one({"sim_mobile_number": assignment.sim_mobile_number})
-        if existing_sim:
-            await db.sim_connections.update_one(
-                {"sim_mobile_number": assignment.sim_mobile_number},
-                {"$set": sim_data}
-            )
-        else:
-            await db.sim_connections.insert_one(sim_data)
+        }))
+    
+    status_changes, *_ = await asyncio.gather(update_asset_fields(assignment.asset_id, {"status": "Assigned"}), *writes)
     
+    await mark_changed("assignments", "assets", "sim_connections", status_changes=status_changes)
     return Assignment(**assignment_dict)
 
 @api_router.put("/assignments/{assignment_id}", response_model=Assignment)
@@ -623,15 +866,17 @@ async def update_assignment(assignment_id: str, assignment: AssignmentCreate, cu
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    existing = await db.assignments.find_one({"assignment_id": assignment_id}, {"_id": 0})
+    existing, employee, asset = await asyncio.gather(
+        db.assignments.find_one({"assignment_id": assignment_id}, {"_id": 0}),
+        db.employees.find_one({"employee_id": assignment.employee_id}, {"_id": 0}),
+        db.assets.find_one({"asset_id": assignment.asset_id}, {"_id": 0})
+    )
     if not existing:
         raise HTTPException(status_code=404, detail="Assignment not found")
     
-    employee = await db.employees.find_one({"employee_id": assignment.employee_id}, {"_id": 0})
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    asset = await db.assets.find_one({"asset_id": assignment.asset_id}, {"_id": 0})
     if not asset:
         raise HTTPException(status_code=404, detail="Asset not found")
     
@@ -639,61 +884,55 @@ async def update_assignment(assignment_id: str, assignment: AssignmentCreate, cu
     assignment_dict["employee_name"] = employee["full_name"]
     assignment_dict["asset_name"] = asset["asset_name"]
     
+    # Update the assignment first, so a failure leaves the asset and SIM as they are; the
+    # writes below touch different documents (or set the same values) and run together
+    await db.assignments.update_one({"assignment_id": assignment_id}, {"$set": assignment_dict})
+    writes = []
+    asset_fields = None
+    
     # Handle asset return with condition
     if assignment.return_date and not existing.get("return_date"):
         # Asset is being returned
         if assignment.asset_return_condition:
             if assignment.asset_return_condition == "Good":
-                await db.assets.update_one(
-                    {"asset_id": assignment.asset_id}, 
-                    {"$set": {"status": "Available", "condition": "Good"}}
-                )
+                asset_fields = {"status": "Available", "condition": "Good"}
             elif assignment.asset_return_condition in ["Damaged", "Needs Repair"]:
-                await db.assets.update_one(
-                    {"asset_id": assignment.asset_id}, 
-                    {"$set": {"status": "Under Repair", "condition": "Damaged"}}
-                )
+                asset_fields = {"status": "Under Repair", "condition": "Damaged"}
         else:
-            await db.assets.update_one({"asset_id": assignment.asset_id}, {"$set": {"status": "Available"}})
+            asset_fields = {"status": "Available"}
         
         # Update SIM Connection on return
         if existing.get("sim_mobile_number"):
-            await db.sim_connections.update_one(
+            writes.append(db.sim_connections.update_one(
                 {"sim_mobile_number": existing["sim_mobile_number"]},
                 {"$set": {
                     "sim_status": "In Stock",
                     "current_owner_name": "Office",
                     "connection_status": "Active"
                 }}
-            )
+            ))
     elif not assignment.return_date and existing.get("return_date"):
-        await db.assets.update_one({"asset_id": assignment.asset_id}, {"$set": {"status": "Assigned"}})
+        # Return date removed, mark as Assigned again
+        asset_fields = {"status": "Assigned"}
     
     # Update SIM Connection if SIM details changed
     if asset.get("category", "").lower() == "mobile" and assignment.sim_mobile_number:
-        sim_data = {
+        writes.append(sim_connection_upsert(assignment.sim_mobile_number, {
             "sim_mobile_number": assignment.sim_mobile_number,
             "current_owner_name": employee["full_name"] if not assignment.return_date else "Office",
             "connection_status": "Active",
             "sim_status": "In Stock" if assignment.return_date else ("Assigned" if assignment.sim_ownership == "With Employee" else "In Stock"),
             "remarks": assignment.sim_purpose or ""
-        }
-        
-        existing_sim = await db.sim_connections.find_one({"sim_mobile_number": assignment.sim_mobile_number})
-        if existing_sim:
-            await db.sim_connections.update_one(
-                {"sim_mobile_number": assignment.sim_mobile_number},
-                {"$set": sim_data}
-            )
-        else:
-            await db.sim_connections.insert_one(sim_data)
-    elif not assignment.return_date and existing.get("return_date"):
-        # Return date removed, mark as Assigned again
-        await db.assets.update_one({"asset_id": assignment.asset_id}, {"$set": {"status": "Assigned"}})
+        }))
     
-    await db.assignments.update_one({"assignment_id": assignment_id}, {"$set": assignment_dict})
+    status_changes = {}
+    if asset_fields:
+        status_changes, *_ = await asyncio.gather(update_asset_fields(assignment.asset_id, asset_fields), *writes)
+    else:
+        await asyncio.gather(*writes)
     
     assignment_dict["assignment_id"] = assignment_id
+    await mark_changed("assignments", "assets", "sim_connections", status_changes=status_changes)
     return Assignment(**assignment_dict)
 
 @api_router.delete("/assignments/{assignment_id}")
@@ -705,250 +944,249 @@ async def delete_assignment(assignment_id: str, current_user: dict = Depends(get
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
     
-    await db.assets.update_one({"asset_id": assignment["asset_id"]}, {"$set": {"status": "Available"}})
+    status_changes = await update_asset_fields(assignment["asset_id"], {"status": "Available"})
     await db.assignments.delete_one({"assignment_id": assignment_id})
     
+    await mark_changed("assignments", "assets", status_changes=status_changes)
     return {"message": "Assignment deleted successfully"}
 
-@api_router.post("/assignments/import")
-async def import_assignments(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
-    if current_user["role"] not in ["HR", "Admin"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    try:
-        contents = await file.read()
-        df = pd.read_excel(BytesIO(contents))
+async def process_assignments_import(job: ImportJob, upload: IO[bytes]) -> dict:
+    reader = await open_sheet(job, upload)
+    
+    # Check for required columns (flexible - either ID or Email/Serial)
+    has_employee_id = 'Employee ID' in reader.columns
+    has_employee_email = 'Employee Email' in reader.columns
+    has_asset_id = 'Asset ID' in reader.columns
+    has_serial_number = 'Asset Serial Number' in reader.columns
+    
+    if not (has_employee_id or has_employee_email):
+        raise HTTPException(status_code=400, detail="File must contain either 'Employee ID' or 'Employee Email' column")
+    
+    if not (has_asset_id or has_serial_number):
+        raise HTTPException(status_code=400, detail="File must contain either 'Asset ID' or 'Asset Serial Number' column")
+    
+    if 'Assigned Date' not in reader.columns:
+        raise HTTPException(status_code=400, detail="File must contain 'Assigned Date' column")
+    
+    row_errors = job.row_errors
+    imported_count = 0
+    
+    def optional_value(row, name):
+        value = row.get(name)
+        return None if value is None else str(value)
+    
+    # Everything looked up so far; an asset's status is updated in place as rows assign it,
+    # so later chunks see assignments made by earlier ones
+    employees_by_id, employees_by_email = {}, {}
+    assets_by_id, assets_by_serial = {}, {}
+    # Asset status as currently stored in Mongo
+    stored_status = {}
+    taken_assignment_ids = set()
+    
+    async for chunk in sheet_chunks(job, reader):
+        # Prefetch what the chunk refers to: one query per collection
+        employee_ids = {optional_value(row, 'Employee ID') for _, row in chunk} - set(employees_by_id) - {None}
+        employee_emails = {optional_value(row, 'Employee Email') for _, row in chunk} - set(employees_by_email) - {None}
+        if employee_ids or employee_emails:
+            cursor = db.employees.find(
+                {"$or": [{"employee_id": {"$in": list(employee_ids)}}, {"email": {"$in": list(employee_emails)}}]},
+                {"_id": 0, "employee_id": 1, "full_name": 1, "email": 1}
+            )
+            async for employee in cursor:
+                employees_by_id.setdefault(employee["employee_id"], employee)
+                employees_by_email.setdefault(employee.get("email"), employee)
         
-        # Check for required columns (flexible - either ID or Email/Serial)
-        has_employee_id = 'Employee ID' in df.columns
-        has_employee_email = 'Employee Email' in df.columns
-        has_asset_id = 'Asset ID' in df.columns
-        has_serial_number = 'Asset Serial Number' in df.columns
+        asset_ids = {optional_value(row, 'Asset ID') for _, row in chunk} - set(assets_by_id) - {None}
+        serial_numbers = {optional_value(row, 'Asset Serial Number') for _, row in chunk} - set(assets_by_serial) - {None}
+        if asset_ids or serial_numbers:
+            cursor = db.assets.find(
+                {"$or": [{"asset_id": {"$in": list(asset_ids)}}, {"serial_number": {"$in": list(serial_numbers)}}]},
+                {"_id": 0, "asset_id": 1, "asset_name": 1, "serial_number": 1, "status": 1}
+            )
+            async for asset in cursor:
+                # The same asset may already be cached under its other key
+                asset = assets_by_id.get(asset["asset_id"], asset)
+                assets_by_id.setdefault(asset["asset_id"], asset)
+                assets_by_serial.setdefault(asset.get("serial_number"), asset)
+                stored_status.setdefault(asset["asset_id"], asset["status"])
         
-        if not (has_employee_id or has_employee_email):
-            raise HTTPException(status_code=400, detail="Excel file must contain either 'Employee ID' or 'Employee Email' column")
+        provided_ids = {optional_value(row, 'Assignment ID') for _, row in chunk} - taken_assignment_ids - {None}
+        if provided_ids:
+            cursor = db.assignments.find({"assignment_id": {"$in": list(provided_ids)}}, {"_id": 0, "assignment_id": 1})
+            async for existing in cursor:
+                taken_assignment_ids.add(existing["assignment_id"])
         
-        if not (has_asset_id or has_serial_number):
-            raise HTTPException(status_code=400, detail="Excel file must contain either 'Asset ID' or 'Asset Serial Number' column")
+        # IDs the file brings must never be generated later; raise the counter past them first
+        # so neither this chunk's reserved IDs nor a later create_assignment can collide with them
+        await raise_sequence(db, "assignments", provided_ids)
         
-        if 'Assigned Date' not in df.columns:
-            raise HTTPException(status_code=400, detail="Excel file must contain 'Assigned Date' column")
+        # Reserve IDs for every row that doesn't bring its own Assignment ID
+        generated_ids = iter(await reserve_ids(db, "assignments", sum(1 for _, row in chunk if row.get('Assignment ID') is None)))
         
-        imported_count = 0
-        errors = []
+        assignments = []
+        row_numbers = []
+        for row_number, row in chunk:
+            # Find employee
+            employee = None
+            if optional_value(row, 'Employee ID') is not None:
+                employee = employees_by_id.get(optional_value(row, 'Employee ID'))
+            elif optional_value(row, 'Employee Email') is not None:
+                employee = employees_by_email.get(optional_value(row, 'Employee Email'))
+            
+            if not employee:
+                row_errors.append((row_number, "Employee not found"))
+                continue
+            
+            # Find asset
+            asset = None
+            if optional_value(row, 'Asset ID') is not None:
+                asset = assets_by_id.get(optional_value(row, 'Asset ID'))
+            elif optional_value(row, 'Asset Serial Number') is not None:
+                asset = assets_by_serial.get(optional_value(row, 'Asset Serial Number'))
+            
+            if not asset:
+                row_errors.append((row_number, "Asset not found"))
+                continue
+            
+            # Check if asset is already assigned (including by an earlier row of this file)
+            if asset["status"] == "Assigned":
+                row_errors.append((row_number, f"Asset {asset['asset_id']} is already assigned"))
+                continue
+            
+            # Generate or use provided Assignment ID
+            if optional_value(row, 'Assignment ID') is not None:
+                assignment_id = optional_value(row, 'Assignment ID')
+                if assignment_id in taken_assignment_ids:
+                    row_errors.append((row_number, f"Assignment ID {assignment_id} already exists"))
+                    continue
+            else:
+                assignment_id = next(generated_ids)
+            taken_assignment_ids.add(assignment_id)
+            
+            assignment_data = {
+                "assignment_id": assignment_id,
+                "employee_id": employee["employee_id"],
+                "employee_name": employee["full_name"],
+                "asset_id": asset["asset_id"],
+                "asset_name": asset["asset_name"],
+                "assigned_date": cell_text(row['Assigned Date'])
+            }
+            for field, name in ASSIGNMENT_OPTIONAL_COLUMNS:
+                assignment_data[field] = optional_value(row, name)
+            
+            asset["status"] = "Available" if assignment_data["return_date"] else "Assigned"
+            assignments.append(assignment_data)
+            row_numbers.append(row_number)
         
-        for index, row in df.iterrows():
+        job.advance(len(chunk) - len(assignments))
+        failed = set()
+        if assignments:
             try:
-                # Find employee
-                employee = None
-                if has_employee_id and pd.notna(row.get('Employee ID')):
-                    employee = await db.employees.find_one({"employee_id": str(row['Employee ID'])}, {"_id": 0})
-                elif has_employee_email and pd.notna(row.get('Employee Email')):
-                    employee = await db.employees.find_one({"email": str(row['Employee Email'])}, {"_id": 0})
-                
-                if not employee:
-                    errors.append(f"Row {index + 2}: Employee not found")
-                    continue
-                
-                # Find asset
-                asset = None
-                if has_asset_id and pd.notna(row.get('Asset ID')):
-                    asset = await db.assets.find_one({"asset_id": str(row['Asset ID'])}, {"_id": 0})
-                elif has_serial_number and pd.notna(row.get('Asset Serial Number')):
-                    asset = await db.assets.find_one({"serial_number": str(row['Asset Serial Number'])}, {"_id": 0})
-                
-                if not asset:
-                    errors.append(f"Row {index + 2}: Asset not found")
-                    continue
-                
-                # Check if asset is already assigned
-                if asset["status"] == "Assigned":
-                    errors.append(f"Row {index + 2}: Asset {asset['asset_id']} is already assigned")
-                    continue
-                
-                # Generate or use provided Assignment ID
-                assignment_id = None
-                if 'Assignment ID' in df.columns and pd.notna(row.get('Assignment ID')):
-                    assignment_id = str(row['Assignment ID'])
-                    # Check if ID already exists
-                    existing = await db.assignments.find_one({"assignment_id": assignment_id}, {"_id": 0})
-                    if existing:
-                        errors.append(f"Row {index + 2}: Assignment ID {assignment_id} already exists")
-                        continue
-                else:
-                    count = await db.assignments.count_documents({})
-                    assignment_id = f"ASG{str(count + 1).zfill(4)}"
-                
-                # Parse dates
-                assigned_date = str(row['Assigned Date'])
-                return_date = None
-                if 'Return Date' in df.columns and pd.notna(row.get('Return Date')):
-                    return_date = str(row['Return Date'])
-                
-                remarks = None
-                if 'Remarks' in df.columns and pd.notna(row.get('Remarks')):
-                    remarks = str(row['Remarks'])
-                
-                # Parse SIM fields
-                sim_provider = None
-                if 'SIM Provider' in df.columns and pd.notna(row.get('SIM Provider')):
-                    sim_provider = str(row['SIM Provider'])
-                
-                sim_mobile_number = None
-                if 'SIM Mobile Number' in df.columns and pd.notna(row.get('SIM Mobile Number')):
-                    sim_mobile_number = str(row['SIM Mobile Number'])
-                
-                sim_type = None
-                if 'SIM Type' in df.columns and pd.notna(row.get('SIM Type')):
-                    sim_type = str(row['SIM Type'])
-                
-                sim_ownership = None
-                if 'SIM Ownership' in df.columns and pd.notna(row.get('SIM Ownership')):
-                    sim_ownership = str(row['SIM Ownership'])
-                
-                sim_purpose = None
-                if 'SIM Purpose' in df.columns and pd.notna(row.get('SIM Purpose')):
-                    sim_purpose = str(row['SIM Purpose'])
-                
-                # Create assignment
-                assignment_data = {
-                    "assignment_id": assignment_id,
-                    "employee_id": employee["employee_id"],
-                    "employee_name": employee["full_name"],
-                    "asset_id": asset["asset_id"],
-                    "asset_name": asset["asset_name"],
-                    "assigned_date": assigned_date,
-                    "return_date": return_date,
-                    "remarks": remarks,
-                    "sim_provider": sim_provider,
-                    "sim_mobile_number": sim_mobile_number,
-                    "sim_type": sim_type,
-                    "sim_ownership": sim_ownership,
-                    "sim_purpose": sim_purpose
-                }
-                
-                await db.assignments.insert_one(assignment_data)
-                
-                # Update asset status
-                if return_date:
-                    await db.assets.update_one({"asset_id": asset["asset_id"]}, {"$set": {"status": "Available"}})
-                else:
-                    await db.assets.update_one({"asset_id": asset["asset_id"]}, {"$set": {"status": "Assigned"}})
-                
-                imported_count += 1
-            except Exception as e:
-                errors.append(f"Row {index + 2}: {str(e)}")
+                await db.assignments.bulk_write([InsertOne(a) for a in assignments], ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get("writeErrors", []):
+                    failed.add(write_error["index"])
+                    row_errors.append((row_numbers[write_error["index"]], write_error.get('errmsg', 'Write failed')))
+        job.advance(len(assignments))
         
-        return {
-            "message": f"Successfully imported {imported_count} asset assignments",
-            "imported": imported_count,
-            "errors": errors
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+        # Last successful row for an asset decides its status
+        asset_status = {}
+        status_changes = {}
+        for position, assignment_data in enumerate(assignments):
+            if position not in failed:
+                asset_status[assignment_data["asset_id"]] = "Available" if assignment_data["return_date"] else "Assigned"
+        if asset_status:
+            await db.assets.bulk_write(
+                [UpdateOne({"asset_id": asset_id}, {"$set": {"status": status}}) for asset_id, status in asset_status.items()],
+                ordered=False
+            )
+            for asset_id, status in asset_status.items():
+                for changed_status, change in status_move(stored_status.get(asset_id), status).items():
+                    status_changes[changed_status] = status_changes.get(changed_status, 0) + change
+                stored_status[asset_id] = status
+                search_index.patch("assets", asset_id, {"status": status})
+        # Rows whose insert failed changed nothing: put their assets back to what is stored
+        for position in failed:
+            asset_id = assignments[position]["asset_id"]
+            assets_by_id[asset_id]["status"] = stored_status[asset_id]
+        
+        imported_count += len(assignments) - len(failed)
+        await mark_changed("assignments", "assets", status_changes=status_changes)
+    
+    return {
+        "message": f"Successfully imported {imported_count} asset assignments",
+        "imported": imported_count,
+        "errors": format_row_errors(row_errors)
+    }
 
-@api_router.get("/assignments/template")
-async def download_assignments_template(current_user: dict = Depends(get_current_user)):
+@api_router.post("/assignments/import", status_code=202)
+async def import_assignments(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Assignments Template"
-    
-    headers = ["Employee ID", "Employee Email", "Asset ID", "Asset Serial Number", "Assigned Date", "Return Date", "Remarks",
-               "SIM Provider", "SIM Mobile Number", "SIM Type", "SIM Ownership", "SIM Purpose"]
-    ws.append(headers)
-    
-    # Add sample data with instructions
-    ws.append(["EMP0001", "john@example.com", "AST0001", "SN123456", "2024-01-15", "", "New laptop for developer", "", "", "", "", ""])
-    ws.append(["", "jane@example.com", "", "356789012345678", "2024-01-16", "", "Mobile with SIM", "Jio", "9876543210", "Physical SIM", "With Employee", "Official number"])
+    upload = await spool_upload(file)
+    job = import_jobs.submit("assignments", file.filename, current_user["username"], process_assignments_import, upload)
+    return job.to_dict()
+
+@api_router.get("/assignments/template")
+async def download_assignments_template(request: Request, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] not in ["HR", "Admin"]:
+        raise HTTPException(status_code=403, detail="Access denied")
     
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
+    return await template_response(request, "assignments")
+
+@api_router.get("/imports/{job_id}")
+async def get_import_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] not in ["HR", "Admin"]:
+        raise HTTPException(status_code=403, detail="Access denied")
     
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=assignments_template.xlsx"}
-    )
+    job = import_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.to_dict()
+
+SIM_CONNECTION_FIELDS = [
+    "assignment_id", "sim_provider", "sim_mobile_number", "sim_type", "sim_ownership", "sim_purpose",
+    "employee_name", "asset_name", "assigned_date", "return_date"
+]
+
+def sim_connections_pipeline() -> List[dict]:
+    """Assignments of mobile assets that carry SIM details, as one aggregation."""
+    return [
+        # Only include if SIM details exist
+        {"$match": {"$or": [
+            {"sim_mobile_number": {"$nin": [None, ""]}},
+            {"sim_provider": {"$nin": [None, ""]}}
+        ]}},
+        # Keep assignments whose asset is a mobile
+        {"$lookup": {
+            "from": "assets",
+            "localField": "asset_id",
+            "foreignField": "asset_id",
+            "as": "asset"
+        }},
+        {"$match": {"asset.category": {"$regex": "^mobile$", "$options": "i"}}},
+        {"$project": {"_id": 0, **{field: {"$ifNull": [f"${field}", None]} for field in SIM_CONNECTION_FIELDS}}}
+    ]
 
 @api_router.get("/sim-connections")
 async def get_sim_connections(current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get all assignments with mobile assets
-    assignments = await db.assignments.find({}, {"_id": 0}).to_list(1000)
-    
-    sim_connections = []
-    for assignment in assignments:
-        # Get asset to check category
-        asset = await db.assets.find_one({"asset_id": assignment["asset_id"]}, {"_id": 0})
-        
-        if asset and asset.get("category", "").lower() == "mobile":
-            # Only include if SIM details exist
-            if assignment.get("sim_mobile_number") or assignment.get("sim_provider"):
-                sim_connections.append({
-                    "assignment_id": assignment.get("assignment_id"),
-                    "sim_provider": assignment.get("sim_provider"),
-                    "sim_mobile_number": assignment.get("sim_mobile_number"),
-                    "sim_type": assignment.get("sim_type"),
-                    "sim_ownership": assignment.get("sim_ownership"),
-                    "sim_purpose": assignment.get("sim_purpose"),
-                    "employee_name": assignment.get("employee_name"),
-                    "asset_name": assignment.get("asset_name"),
-                    "assigned_date": assignment.get("assigned_date"),
-                    "return_date": assignment.get("return_date")
-                })
-    
-    return sim_connections
+    return json_array_response(db.assignments.aggregate(sim_connections_pipeline()))
 
 @api_router.get("/sim-connections/export")
-async def export_sim_connections(current_user: dict = Depends(get_current_user)):
+async def export_sim_connections(format: str = "xlsx", current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get all SIM connections
-    assignments = await db.assignments.find({}, {"_id": 0}).to_list(1000)
-    
-    sim_connections = []
-    for assignment in assignments:
-        asset = await db.assets.find_one({"asset_id": assignment["asset_id"]}, {"_id": 0})
-        if asset and asset.get("category", "").lower() == "mobile":
-            if assignment.get("sim_mobile_number") or assignment.get("sim_provider"):
-                sim_connections.append(assignment)
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "SIM Connections"
-    
-    headers = ["SIM Provider", "SIM Mobile Number", "SIM Type", "SIM Ownership", "SIM Purpose", 
-               "Employee Name", "Asset Name", "Assigned Date", "Return Date"]
-    ws.append(headers)
-    
-    for conn in sim_connections:
-        ws.append([
-            conn.get("sim_provider", ""),
-            conn.get("sim_mobile_number", ""),
-            conn.get("sim_type", ""),
-            conn.get("sim_ownership", ""),
-            conn.get("sim_purpose", ""),
-            conn.get("employee_name", ""),
-            conn.get("asset_name", ""),
-            conn.get("assigned_date", ""),
-            conn.get("return_date", "")
-        ])
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=sim_connections.xlsx"}
+    return await export_response(
+        format,
+        db.assignments.aggregate(sim_connections_pipeline()),
+        "SIM Connections",
+        SIM_CONNECTION_EXPORT_COLUMNS,
+        "sim_connections"
     )
 
 @api_router.get("/dashboard/stats", response_model=DashboardStats)
@@ -956,111 +1194,88 @@ async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    total_assets = await db.assets.count_documents({})
-    assigned_assets = await db.assets.count_documents({"status": "Assigned"})
-    available_assets = await db.assets.count_documents({"status": "Available"})
-    total_employees = await db.employees.count_documents({})
+    stats = dashboard_cache.get("stats")
+    if stats is not MISSING:
+        return stats
     
-    return {
-        "total_assets": total_assets,
-        "assigned_assets": assigned_assets,
-        "available_assets": available_assets,
-        "total_employees": total_employees
-    }
+    # Counters are maintained by the write paths; rebuild them only if the document is missing
+    counters = await read_stats(db)
+    if counters is None:
+        await reconcile_stats(db)
+        counters = await read_stats(db)
+    
+    stats = dashboard_figures(counters)
+    dashboard_cache.set("stats", stats)
+    return stats
+
+@api_router.get("/dashboard/stats/cache")
+async def get_dashboard_cache_stats(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] not in ["HR", "Admin"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return dashboard_cache.stats()
 
 @api_router.get("/pending-returns", response_model=List[PendingReturn])
 async def get_pending_returns(current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    exit_employees = await db.employees.find({"status": "Exit"}, {"_id": 0}).to_list(1000)
-    pending_returns = []
-    
-    for employee in exit_employees:
-        unreturned_assets = await db.assignments.find(
-            {
-                "employee_id": employee["employee_id"],
-                "return_date": None
-            },
-            {"_id": 0}
-        ).to_list(1000)
-        
-        if unreturned_assets:
-            pending_returns.append({
-                "employee_id": employee["employee_id"],
-                "employee_name": employee["full_name"],
-                "email": employee["email"],
-                "assets": unreturned_assets
-            })
-    
-    return pending_returns
+    # Start from the employees who have left (status index) and join their assignments on
+    # employee_id (the employee_id_return_date index), keeping the unreturned ones
+    pipeline = [
+        {"$match": {"status": "Exit"}},
+        {"$lookup": {
+            "from": "assignments",
+            "localField": "employee_id",
+            "foreignField": "employee_id",
+            "as": "assets"
+        }},
+        {"$project": {
+            "_id": 0,
+            "employee_id": 1,
+            "employee_name": "$full_name",
+            "email": 1,
+            # return_date missing or null, like the {"return_date": None} query
+            "assets": {"$filter": {"input": "$assets", "cond": {"$eq": [{"$ifNull": ["$$this.return_date", None]}, None]}}}
+        }},
+        {"$match": {"assets": {"$ne": []}}},
+        {"$project": {"assets._id": 0}},
+        {"$sort": {"employee_id": 1}}
+    ]
+    
+    return await db.employees.aggregate(pipeline).to_list(None)
 
 @api_router.get("/search/employees")
 async def search_employees(q: str, current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    query = {
-        "$or": [
-            {"full_name": {"$regex": q, "$options": "i"}},
-            {"employee_id": {"$regex": q, "$options": "i"}},
-            {"department": {"$regex": q, "$options": "i"}}
-        ]
-    }
-    employees = await db.employees.find(query, {"_id": 0}).to_list(100)
+    employees = await search_documents("employees", q, ["full_name", "employee_id", "department"], 100)
     
+    assignments = await active_assignments_by("employee_id", [e["employee_id"] for e in employees])
     for employee in employees:
-        assignments = await db.assignments.find(
-            {"employee_id": employee["employee_id"], "return_date": None},
-            {"_id": 0}
-        ).to_list(100)
-        employee["assigned_assets"] = assignments
+        employee["assigned_assets"] = assignments.get(employee["employee_id"], [])[:100]
     
     return employees
 
 @api_router.get("/assignments/export")
-async def export_assignments(current_user: dict = Depends(get_current_user)):
+async def export_assignments(format: str = "xlsx", current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["HR", "Admin"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    assignments = await db.assignments.find({}, {"_id": 0}).to_list(1000)
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Asset Assignments"
-    
-    headers = ["Assignment ID", "Employee ID", "Employee Name", "Asset ID", "Asset Name", 
-               "Assigned Date", "Return Date", "Remarks",
-               "SIM Provider", "SIM Mobile Number", "SIM Type", "SIM Ownership", "SIM Purpose"]
-    ws.append(headers)
-    
-    for assignment in assignments:
-        ws.append([
-            assignment.get("assignment_id", ""),
-            assignment.get("employee_id", ""),
-            assignment.get("employee_name", ""),
-            assignment.get("asset_id", ""),
-            assignment.get("asset_name", ""),
-            assignment.get("assigned_date", ""),
-            assignment.get("return_date", ""),
-            assignment.get("remarks", ""),
-            assignment.get("sim_provider", ""),
-            assignment.get("sim_mobile_number", ""),
-            assignment.get("sim_type", ""),
-            assignment.get("sim_ownership", ""),
-            assignment.get("sim_purpose", "")
-        ])
-    
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=asset_assignments.xlsx"}
+    return await export_response(
+        format,
+        db.assignments.find({}, {"_id": 0}),
+        "Asset Assignments",
+        ASSIGNMENT_EXPORT_COLUMNS,
+        "asset_assignments"
     )
 
+@api_router.get("/metrics/event-loop")
+async def get_event_loop_metrics(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] not in ["HR", "Admin"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return {"lag": loop_monitor.stats(), "offload": offload.stats()}
+
 app.include_router(api_router)
 
 app.add_middleware(
@@ -1069,6 +1284,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "ETag"],
 )
 
 logging.basicConfig(
@@ -1077,6 +1293,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def check_single_worker():
+    # uvicorn takes its default --workers from WEB_CONCURRENCY
+    if API_WORKERS > 1:
+        raise RuntimeError(f"WEB_CONCURRENCY is {API_WORKERS}, but the API keeps its state in process and must run as a single worker")
+
+@app.on_event("startup")
+async def startup_loop_monitor():
+    loop_monitor.start()
+
+@app.on_event("startup")
+async def startup_token_revocations():
+    token_revocations.start(db, revoke_cached_tokens)
+
+@app.on_event("startup")
+async def startup_ensure_indexes():
+    try:
+        report = await ensure_indexes(db)
+        log_index_report(report)
+    except Exception as e:
+        logger.error(f"Index check failed: {str(e)}")
+
+@app.on_event("startup")
+async def startup_seed_sequences():
+    try:
+        values = await seed_sequences(db)
+        logger.info(f"ID sequences: {values}")
+    except Exception as e:
+        logger.error(f"Seeding ID sequences failed: {str(e)}")
+
+@app.on_event("startup")
+async def startup_reconcile_stats():
+    try:
+        drift = await reconcile_stats(db)
+        for field, (stored, actual) in drift.items():
+            logger.warning(f"Dashboard counter {field} drifted: stored {stored}, actual {actual} (fixed)")
+    except Exception as e:
+        logger.error(f"Reconciling dashboard counters failed: {str(e)}")
+
+@app.on_event("startup")
+async def startup_build_search_index():
+    try:
+        employees, assets = await asyncio.gather(
+            db.employees.find({}, {"_id": 0}).to_list(None),
+            db.assets.find({}, {"_id": 0}).to_list(None)
+        )
+        search_index.load("employees", employees)
+        search_index.load("assets", assets)
+        search_index.ready = True
+        logger.info(f"Search index built: {search_index.stats()}")
+    except Exception as e:
+        logger.error(f"Building search index failed, searching Mongo instead: {str(e)}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    client.close()
+    password_hasher.shutdown()
+    import_jobs.shutdown()
+    offload.shutdown()
+    loop_monitor.stop()
+    token_revocations.stop()
\ No newline at end of file
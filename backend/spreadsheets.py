@@ -0,0 +1,143 @@
+"""Streaming readers for uploaded import files, .xlsx or CSV.
+
+The upload is spooled to a temporary file (in memory up to
+``IMPORT_SPOOL_MAX_SIZE``). An .xlsx file is opened with openpyxl in ``read_only``
+mode, which parses the sheet XML as rows are requested instead of loading the
+workbook; a CSV file is decoded and split by the csv module as it is read. Rows
+come back as dicts keyed by the header row, a chunk at a time, so an import can
+validate and insert one chunk before the next is parsed.
+
+Both formats follow the contract ``pd.read_excel`` had: the first row is the
+header, blank rows in the middle are kept (they still count for row numbers) and
+trailing ones are dropped, and empty cells as well as pandas' default NA strings
+("N/A", "null", ...) come back as None, so ``value is None`` is the old
+``pd.notna`` check. Unlike pandas, a numeric cell is never widened to float
+because another cell in its column is blank.
+"""
+import csv
+import io
+from tempfile import SpooledTemporaryFile
+from typing import IO, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import UploadFile
+from openpyxl import load_workbook
+
+# Uploads up to this size stay in memory, bigger ones roll over to a temp file
+IMPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Every .xlsx file is a zip archive
+XLSX_SIGNATURE = b"PK\x03\x04"
+
+# pandas' default na_values for read_excel
+NA_STRINGS = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+])
+
+# (row number in the sheet, {header: value})
+Row = Tuple[int, dict]
+
+
+async def spool_upload(upload: UploadFile) -> SpooledTemporaryFile:
+    """Copy an upload into a file the caller owns, so it can outlive the request."""
+    spooled = SpooledTemporaryFile(max_size=IMPORT_SPOOL_MAX_SIZE)
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+
+def cell_value(value):
+    if isinstance(value, str) and value in NA_STRINGS:
+        return None
+    return value
+
+
+def cell_text(value) -> str:
+    """A cell as text; missing cells give an empty string."""
+    return "" if value is None else str(value)
+
+
+class RowReader:
+    """Rows of an uploaded sheet, chunk by chunk. Blocking: run it through offload.run.
+
+    ``records`` yields each row's cell values; the first one is the header.
+    """
+
+    # Rows below the header as declared by the file, when it says
+    estimated_rows: Optional[int] = None
+
+    def __init__(self, records: Iterator[Sequence], chunk_size: int):
+        self.chunk_size = chunk_size
+        self._records = records
+        header = next(self._records, ())
+        self.columns: List = [
+            value if value not in (None, "") else f"Unnamed: {position}" for position, value in enumerate(header)
+        ]
+        self._row_number = 1
+        self._blank_rows: List[Row] = []
+
+    def _next_rows(self) -> Iterator[Row]:
+        width = len(self.columns)
+        for values in self._records:
+            self._row_number += 1
+            values = [cell_value(value) for value in values[:width]]
+            values += [None] * (width - len(values))
+            row = (self._row_number, dict(zip(self.columns, values)))
+            if all(value is None for value in values):
+                # Only kept if a non-blank row follows
+                self._blank_rows.append(row)
+                continue
+            yield from self._blank_rows
+            self._blank_rows = []
+            yield row
+
+    def chunks(self) -> Iterator[List[Row]]:
+        chunk = []
+        for row in self._next_rows():
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def close(self):
+        pass
+
+
+class SheetReader(RowReader):
+    """The first worksheet of an .xlsx file."""
+
+    def __init__(self, fileobj: IO[bytes], chunk_size: int):
+        self._workbook = load_workbook(fileobj, read_only=True, data_only=True)
+        sheet = self._workbook.worksheets[0]
+        # Declared sheet size, which may count trailing formatted but empty rows
+        self.estimated_rows = max((sheet.max_row or 1) - 1, 0)
+        super().__init__(sheet.iter_rows(values_only=True), chunk_size)
+
+    def close(self):
+        self._workbook.close()
+
+
+class CsvReader(RowReader):
+    """A CSV file, decoded and split into records as the chunks are read. Every cell is text."""
+
+    def __init__(self, fileobj: IO[bytes], chunk_size: int):
+        # utf-8-sig drops the byte order mark Excel writes at the start of CSV exports
+        self._text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+        super().__init__(csv.reader(self._text), chunk_size)
+
+    def close(self):
+        # Leave the upload itself to its owner
+        self._text.detach()
+
+
+def open_reader(fileobj: IO[bytes], chunk_size: int) -> RowReader:
+    """SheetReader for .xlsx (a zip archive), CsvReader for anything else."""
+    is_xlsx = fileobj.read(4) == XLSX_SIGNATURE
+    fileobj.seek(0)
+    return SheetReader(fileobj, chunk_size) if is_xlsx else CsvReader(fileobj, chunk_size)
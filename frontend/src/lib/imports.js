@@ -0,0 +1,29 @@
+import api from './api';
+
+const POLL_INTERVAL_MS = 1000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Uploads a spreadsheet to an /import endpoint, which answers with a background
+// job, and polls /imports/{job_id} until it finishes. Resolves with the same
+// shape as an axios response ({ data: summary }) so callers can treat it like one.
+export const runImport = async (path, formData) => {
+  const { data: submitted } = await api.post(path, formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+  });
+
+  let job = submitted;
+  while (job.status === 'queued' || job.status === 'running') {
+    await sleep(POLL_INTERVAL_MS);
+    ({ data: job } = await api.get(`/imports/${job.job_id}`));
+  }
+
+  if (job.status === 'failed') {
+    const error = new Error(job.error);
+    error.response = { data: { detail: job.error } };
+    throw error;
+  }
+  return { data: job.result };
+};
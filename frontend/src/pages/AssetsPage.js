@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef } from 'react';
 import api from '@/lib/api';
+import { runImport } from '@/lib/imports';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
@@ -239,11 +240,7 @@ export default function AssetsPage() {
     formData.append('file', file);
 
     try {
-      const response = await api.post('/assets/import', formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
-      });
+      const response = await runImport('/assets/import', formData);
       
       // Check if there are errors in the response
       if (response.data.success === false || (response.data.errors && response.data.errors.length > 0)) {
@@ -332,7 +329,7 @@ export default function AssetsPage() {
           <input
             ref={fileInputRef}
             type="file"
-            accept=".xlsx,.xls"
+            accept=".xlsx,.csv"
             onChange={handleImport}
             className="hidden"
             data-testid="import-assets-file-input"
@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef } from 'react';
 import api from '@/lib/api';
+import { runImport } from '@/lib/imports';
 import { getUserRole } from '@/lib/auth';
 import { formatDisplayDate } from '@/lib/utils';
 import { Button } from '@/components/ui/button';
@@ -265,11 +266,7 @@ export default function AssignmentsPage() {
     formData.append('file', file);
 
     try {
-      const response = await api.post('/assignments/import', formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
-      });
+      const response = await runImport('/assignments/import', formData);
       toast.success(response.data.message);
       if (response.data.errors && response.data.errors.length > 0) {
         console.error('Import errors:', response.data.errors);
@@ -319,7 +316,7 @@ export default function AssignmentsPage() {
           <input
             ref={fileInputRef}
             type="file"
-            accept=".xlsx,.xls"
+            accept=".xlsx,.csv"
             onChange={handleImport}
             className="hidden"
             data-testid="import-assignments-file-input"
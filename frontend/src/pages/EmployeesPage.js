@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef } from 'react';
 import api from '@/lib/api';
+import { runImport } from '@/lib/imports';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
@@ -172,11 +173,7 @@ export default function EmployeesPage() {
     formData.append('file', file);
 
     try {
-      const response = await api.post('/employees/import', formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
-      });
+      const response = await runImport('/employees/import', formData);
       toast.success(response.data.message);
       if (response.data.errors && response.data.errors.length > 0) {
         toast.warning(`Some rows had errors: ${response.data.errors.length} errors`);
@@ -211,7 +208,7 @@ export default function EmployeesPage() {
           <input
             ref={fileInputRef}
             type="file"
-            accept=".xlsx,.xls"
+            accept=".xlsx,.csv"
             onChange={handleImport}
             className="hidden"
             data-testid="import-file-input"
@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef } from 'react';
 import api from '@/lib/api';
+import { runImport } from '@/lib/imports';
 import { formatDisplayDate } from '@/lib/utils';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -90,11 +91,7 @@ export default function SIMConnectionsPage() {
     formData.append('file', file);
 
     try {
-      const response = await api.post('/assignments/import', formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
-      });
+      const response = await runImport('/assignments/import', formData);
       toast.success(response.data.message);
       if (response.data.errors && response.data.errors.length > 0) {
         console.error('Import errors:', response.data.errors);
@@ -130,7 +127,7 @@ export default function SIMConnectionsPage() {
           <input
             ref={fileInputRef}
             type="file"
-            accept=".xlsx,.xls"
+            accept=".xlsx,.csv"
             onChange={handleImport}
             className="hidden"
             data-testid="import-sim-file-input"
@@ -0,0 +1,77 @@
+"""Compare the default response_model serialization of /assignments with the orjson fast path.
+
+Runs offline on synthetic documents shaped like the assignments collection; no
+database is needed. Usage: python scripts/bench_list_serialization.py [--rows 10000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from fast_json import trusted_response  # noqa: E402
+from server import Assignment  # noqa: E402
+
+
+def make_documents(rows):
+    return [{
+        "assignment_id": f"ASN{i:04d}",
+        "employee_id": f"EMP{i % 500:04d}",
+        "employee_name": f"Employee {i % 500}",
+        "asset_id": f"AST{i:04d}",
+        "asset_name": "Dell Latitude 5440",
+        "assigned_date": "2024-01-15",
+        "return_date": None if i % 3 else "2024-06-30",
+        "remarks": "Issued for project work",
+        "sim_provider": "Jio" if i % 4 == 0 else None,
+        "sim_mobile_number": f"98{i:08d}" if i % 4 == 0 else None,
+    } for i in range(rows)]
+
+
+async def default_path(field, documents):
+    content = await serialize_response(field=field, response_content=documents)
+    return JSONResponse(content).body
+
+
+def fast_path(documents):
+    return trusted_response(Assignment, documents).body
+
+
+def best_of(runs, func):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main(rows, runs):
+    field = create_response_field(name="Response_get_assignments", type_=List[Assignment])
+    before = best_of(runs, lambda: asyncio.run(default_path(field, make_documents(rows))))
+    after = best_of(runs, lambda: fast_path(make_documents(rows)))
+    building = best_of(runs, lambda: make_documents(rows))
+    before, after = before - building, after - building
+
+    print(f"{rows} assignments, best of {runs} runs")
+    print(f"response_model + JSONResponse: {before:8.1f} ms")
+    print(f"trusted_response (orjson):     {after:8.1f} ms")
+    print(f"speedup:                       {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    main(args.rows, args.runs)
@@ -0,0 +1,40 @@
+import asyncio
+import argparse
+import sys
+from pathlib import Path
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+from dotenv import load_dotenv
+
+load_dotenv('/app/backend/.env')
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+from indexes import ensure_indexes  # noqa: E402
+
+async def main(check_only, rebuild):
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[os.environ['DB_NAME']]
+
+    report = await ensure_indexes(db, create_missing=not check_only, rebuild_drifted=rebuild and not check_only)
+
+    for label in report["ok"]:
+        print(f"OK       {label}")
+    for label in report["created"]:
+        print(f"CREATED  {label}")
+    for label in report["drifted"]:
+        print(f"DRIFT    {label}")
+    for label in report["rebuilt"]:
+        print(f"REBUILT  {label}")
+    for label in report["failed"]:
+        print(f"FAILED   {label}")
+
+    client.close()
+    return 1 if report["failed"] or (report["drifted"] and not rebuild) else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and reconcile the MongoDB indexes declared in backend/indexes.py")
+    parser.add_argument("--check", action="store_true", help="Only report missing or differing indexes, change nothing")
+    parser.add_argument("--rebuild", action="store_true", help="Drop and recreate indexes that differ from the declaration")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.check, args.rebuild)))
@@ -1,4 +1,6 @@
 import asyncio
+import sys
+from pathlib import Path
 from motor.motor_asyncio import AsyncIOMotorClient
 from passlib.context import CryptContext
 import os
@@ -6,6 +8,9 @@ from dotenv import load_dotenv
 
 load_dotenv('/app/backend/.env')
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+from revocations import revocation_marker  # noqa: E402
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 async def init_users():
@@ -24,12 +29,15 @@ async def init_users():
         })
         print("Admin user created: username=admin, password=admin123, role=HR")
     else:
-        # Update existing admin to have role
-        await db.users.update_one(
-            {"username": "admin"},
-            {"$set": {"role": "HR"}}
+        # Update existing admin to have role; tokens issued with the old role stop working
+        result = await db.users.update_one(
+            {"username": "admin", "role": {"$ne": "HR"}},
+            {"$set": {"role": "HR", **revocation_marker()}}
         )
-        print("Admin user updated with HR role")
+        if result.modified_count:
+            print("Admin user updated with HR role")
+        else:
+            print("Admin user already has the HR role")
     
     # Create employee user linked to employee record
     # First check if we have any employee
@@ -0,0 +1,33 @@
+import asyncio
+import argparse
+import sys
+from pathlib import Path
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+from dotenv import load_dotenv
+
+load_dotenv('/app/backend/.env')
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+from dashboard_stats import reconcile_stats  # noqa: E402
+
+async def main(check_only):
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[os.environ['DB_NAME']]
+
+    drift = await reconcile_stats(db, fix=not check_only)
+
+    if not drift:
+        print("Dashboard counters match the collections")
+    for field, (stored, actual) in sorted(drift.items()):
+        print(f"DRIFT    {field}: stored {stored}, actual {actual}{'' if check_only else ' (fixed)'}")
+
+    client.close()
+    return 1 if drift and check_only else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute the materialized dashboard counters and report any drift")
+    parser.add_argument("--check", action="store_true", help="Only report drift, leave the stored counters as they are")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.check)))
@@ -0,0 +1,102 @@
+import pytest
+
+from search_index import SearchIndex
+
+KINDS = {"assets": ("asset_id", ["asset_name", "serial_number", "asset_id"])}
+
+
+def asset(number: int, name: str, serial: str = None, **fields) -> dict:
+    return {"asset_id": f"AST{number:04d}", "asset_name": name, "serial_number": serial or f"SN{number:06d}", **fields}
+
+
+def keys(results):
+    return [document["asset_id"] for document in results]
+
+
+class CountingDict(dict):
+    """Counts lookups, i.e. how many candidate documents a search looked at."""
+    lookups = 0
+
+    def __getitem__(self, key):
+        self.lookups += 1
+        return super().__getitem__(key)
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex(KINDS)
+    index.load("assets", [
+        asset(1, "Dell"),
+        asset(2, "Dell Latitude 5420"),
+        asset(3, "Latitude by Dell"),
+        asset(4, "Modell X"),
+        asset(5, "HP EliteBook", serial="DELL-0005"),
+    ])
+    return index
+
+
+def test_ranking_tiers(index):
+    # exact value, value prefix, word prefix, substring; the earlier field wins a tie
+    assert keys(index.search("assets", "dell")) == ["AST0001", "AST0002", "AST0005", "AST0003", "AST0004"]
+    assert keys(index.search("assets", "dell", fields=["asset_name"])) == ["AST0001", "AST0002", "AST0003", "AST0004"]
+
+
+def test_short_queries_match_prefixes_only(index):
+    assert keys(index.search("assets", "mo")) == ["AST0004"]
+    assert index.search("assets", "ll") == []
+
+
+def test_limit(index):
+    assert keys(index.search("assets", "dell", limit=2)) == ["AST0001", "AST0002"]
+    assert index.search("assets", "dell", limit=0) == []
+
+
+def test_upsert_patch_and_remove(index):
+    index.patch("assets", "AST0001", {"status": "Assigned"})
+    assert index.search("assets", "dell", limit=1)[0]["status"] == "Assigned"
+
+    index.patch("assets", "AST0001", {"asset_name": "Zebra"})
+    assert keys(index.search("assets", "zebra")) == ["AST0001"]
+    assert "AST0001" not in keys(index.search("assets", "dell"))
+
+    index.upsert_many("assets", [asset(6, "Dell Vostro"), asset(2, "Spare")])
+    assert keys(index.search("assets", "dell vo")) == ["AST0006"]
+    assert keys(index.search("assets", "spare")) == ["AST0002"]
+    assert keys(index.search("assets", "latitude")) == ["AST0003"]
+
+    index.remove("assets", "AST0006")
+    assert index.search("assets", "vostro") == []
+    assert index.stats() == {"assets": 5}
+
+
+def test_load_with_a_repeated_key():
+    # Legacy data may hold the same ID twice; the repeat comes after terms the load has just added
+    index = SearchIndex(KINDS)
+    index.load("assets", [asset(1, "Bob"), asset(2, "Zed"), asset(3, "Amy"), asset(3, "Amy Pond")])
+    assert keys(index.search("assets", "bob")) == ["AST0001"]
+    assert keys(index.search("assets", "zed")) == ["AST0002"]
+    assert [document["asset_name"] for document in index.search("assets", "amy")] == ["Amy Pond"]
+    for field_index in index._fields["assets"].values():
+        assert field_index.values.terms == sorted(field_index.values.postings)
+        assert field_index.words.terms == sorted(field_index.words.postings)
+
+
+def test_upsert_many_replacing_after_new_terms():
+    index = SearchIndex(KINDS)
+    index.load("assets", [asset(4, "dd")])
+    index.upsert_many("assets", [asset(1, "aa"), asset(3, "cc"), asset(4, "ee")])
+    assert [keys(index.search("assets", name)) for name in ("aa", "cc", "dd", "ee")] == [["AST0001"], ["AST0003"], [], ["AST0004"]]
+    assert index.stats() == {"assets": 3}
+
+
+@pytest.mark.parametrize("query", ["dell", "de", "ell", "latitude", "5"])
+def test_search_cost_does_not_grow_with_matches(query):
+    """Every document matches the query in every tier; a search must stop once the page is full."""
+    lookups = []
+    for size in (100, 10000):
+        index = SearchIndex(KINDS)
+        index.load("assets", [asset(number, f"Dell Latitude {number}5 Modell") for number in range(size)])
+        counting = index._values["assets"] = CountingDict(index._values["assets"])
+        assert len(index.search("assets", query, limit=10)) == 10
+        lookups.append(counting.lookups)
+    assert lookups[0] == lookups[1] <= 20
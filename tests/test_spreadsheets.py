@@ -0,0 +1,104 @@
+import io
+
+import pytest
+from openpyxl import Workbook
+
+from spreadsheets import CsvReader, SheetReader, cell_text, open_reader
+
+ROWS = [
+    ["Full Name", "Email", None, "Phone"],
+    ["Alice", "alice@example.com", "x", 9876543210],
+    [None, None, None, None],
+    ["Bob", "N/A", None, None],
+    ["", "null", "", ""],
+    ["Carol", "carol@example.com", None, 5],
+    [None, None, None, None],
+    [None, None, None, None],
+]
+
+
+def xlsx_file(rows) -> io.BytesIO:
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    fileobj = io.BytesIO()
+    workbook.save(fileobj)
+    fileobj.seek(0)
+    return fileobj
+
+
+def csv_file(rows, bom: bool = True) -> io.BytesIO:
+    text = "\r\n".join(",".join("" if value is None else str(value) for value in row) for row in rows) + "\r\n"
+    # Excel starts its CSV exports with a byte order mark
+    return io.BytesIO((("\ufeff" if bom else "") + text).encode("utf-8"))
+
+
+def read_all(reader):
+    rows = [row for chunk in reader.chunks() for row in chunk]
+    reader.close()
+    return rows
+
+
+@pytest.fixture(params=["xlsx", "csv"])
+def reader(request):
+    fileobj = xlsx_file(ROWS) if request.param == "xlsx" else csv_file(ROWS)
+    return open_reader(fileobj, chunk_size=2)
+
+
+def test_reader_for_format():
+    assert isinstance(open_reader(xlsx_file(ROWS), 10), SheetReader)
+    assert isinstance(open_reader(csv_file(ROWS), 10), CsvReader)
+
+
+def test_header_names_blank_columns(reader):
+    assert reader.columns == ["Full Name", "Email", "Unnamed: 2", "Phone"]
+    read_all(reader)
+
+
+def test_row_numbers_match_the_sheet(reader):
+    # Blank rows in the middle are kept and counted, trailing ones are dropped
+    assert [row_number for row_number, _ in read_all(reader)] == [2, 3, 4, 5, 6]
+
+
+def test_empty_cells_and_na_strings_are_none(reader):
+    rows = dict(read_all(reader))
+    assert rows[3] == {"Full Name": None, "Email": None, "Unnamed: 2": None, "Phone": None}
+    assert rows[4]["Full Name"] == "Bob"
+    assert rows[4]["Email"] is None
+    assert rows[4]["Phone"] is None
+    # A row of empty strings and NA strings is as blank as an empty one
+    assert all(value is None for value in rows[5].values())
+
+
+def test_cell_text(reader):
+    rows = dict(read_all(reader))
+    assert cell_text(rows[2]["Full Name"]) == "Alice"
+    assert cell_text(rows[4]["Email"]) == ""
+    # Numbers are never widened to float because another cell in the column is blank
+    assert cell_text(rows[2]["Phone"]) == "9876543210"
+    assert cell_text(rows[6]["Phone"]) == "5"
+
+
+def test_chunks(reader):
+    chunks = list(reader.chunks())
+    assert [[row_number for row_number, _ in chunk] for chunk in chunks] == [[2, 3], [4, 5], [6]]
+    reader.close()
+
+
+def test_short_and_long_rows_fit_the_header():
+    fileobj = csv_file([["A", "B"], ["1"], ["2", "3", "extra"]], bom=False)
+    assert read_all(open_reader(fileobj, 10)) == [(2, {"A": "1", "B": None}), (3, {"A": "2", "B": "3"})]
+
+
+def test_header_only_and_empty_files():
+    assert read_all(open_reader(xlsx_file([["A", "B"]]), 10)) == []
+    reader = open_reader(csv_file([], bom=False), 10)
+    assert reader.columns == []
+    assert read_all(reader) == []
+
+
+def test_csv_reader_leaves_the_upload_open():
+    fileobj = csv_file(ROWS)
+    read_all(open_reader(fileobj, 10))
+    assert not fileobj.closed